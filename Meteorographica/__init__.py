@@ -17,4 +17,5 @@ from . import pressure
 from . import wind
 from . import precipitation
 from . import observations
+from . import tiles
 
@@ -1,11 +1,17 @@
 import cartopy
 import cartopy.crs as ccrs
+import numpy
 import matplotlib
+import matplotlib.colors
+import matplotlib.collections
 import pandas
 
+# Plot observations as circles
 def plot_patches(ax,obs,**kwargs):
     """Plot observations as points.
 
+    All the observations are drawn as a single :class:`matplotlib.collections.EllipseCollection`, rather than an artist for each, so even very large numbers of observations draw quickly.
+
     Args:
         ax (:obj:`cartopy.mpl.geoaxes.GeoAxes`): Axes on which to draw.
         obs (:obj:`pandas.DataFrame`): Data frame containing obs positions.
@@ -21,7 +27,7 @@ def plot_patches(ax,obs,**kwargs):
         zorder (:obj:`float`): Standard matplotlib parameter determining which things are plotted on top (high zorder), and which underneath (low zorder), Defaults to 25.
 
     Returns:
-        Nothing - adds the obs. points to the plot.
+        :obj:`matplotlib.collections.EllipseCollection` - all the obs. circles, as a single collection. Also adds them to the plot.
 
     |
     """
@@ -41,19 +47,34 @@ def plot_patches(ax,obs,**kwargs):
     new_longitude=rp[:,0]
     new_latitude=rp[:,1]
 
-    # Plot each ob as a circle
-    for i in range(0,len(new_longitude)):
-        weight=1.0
-        if 'weight' in obs.columns: weight=obs['weight'].values[i]
-        ax.add_patch(matplotlib.patches.Circle((new_longitude[i],
-                                                new_latitude[i]),
-                                                radius=kwargs.get('radius'),
-                                                facecolor=kwargs.get('facecolor'),
-                                                edgecolor=kwargs.get('edgecolor'),
-                                                alpha=kwargs.get('alpha')*weight,
-                                                zorder=kwargs.get('zorder')))
-
-    
+    # All the obs as one collection of circles (radius in data units),
+    #  with the weight multiplied into each circle's alpha
+    alphas=numpy.full(len(new_longitude),kwargs.get('alpha'),dtype=float)
+    if 'weight' in obs.columns:
+        alphas*=obs['weight'].values
+    # Like a patch alpha, the weighted alpha replaces the colour's own
+    #  - except for 'none' (alpha 0), which stays invisible
+    colors=[]
+    for color in (kwargs.get('facecolor'),kwargs.get('edgecolor')):
+        rgba=numpy.empty((len(alphas),4))
+        rgba[:]=matplotlib.colors.to_rgba(color)
+        if rgba.shape[0]>0 and rgba[0,3]>0:
+            rgba[:,3]=alphas
+        colors.append(rgba)
+    facecolors,edgecolors=colors
+    diameters=numpy.full(len(alphas),kwargs.get('radius')*2.0)
+    circles=matplotlib.collections.EllipseCollection(diameters,diameters,
+                                numpy.zeros(len(alphas)),
+                                units='xy',
+                                offsets=numpy.column_stack((new_longitude,
+                                                            new_latitude)),
+                                offset_transform=ax.transData,
+                                facecolors=facecolors,
+                                edgecolors=edgecolors,
+                                zorder=kwargs.get('zorder'))
+    ax.add_collection(circles,autolim=False)
+    return circles
+
 # Plot observations
 def plot(ax,obs,**kwargs):
     """Plot observations.
@@ -0,0 +1,108 @@
+# (C) British Crown Copyright 2017, Met Office
+#
+# This code is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This code is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+
+# Totals over a series of fields - daily or event-total precipitation.
+
+import numpy
+import iris
+import iris.cube
+import iris.coords
+import cf_units
+
+import Meteorographica.utils as utils
+
+# The 2d fields in a time series - either slices of a cube, or
+#  the cubes in a list (or generator).
+def _time_steps(pe,time_dimension):
+    if not isinstance(pe,iris.cube.Cube):
+        return iter(pe)
+    if pe.coords(time_dimension) and pe.coord_dims(time_dimension):
+        return pe.slices_over(time_dimension)
+    return iter([pe])
+
+# Start and end of the period covered by a series of time points -
+#  each point is the end of a time step, so the period starts a step
+#  before the first point. The step is the spacing of the points, or
+#  (for a single point) the step length, if that is in seconds.
+def _period(coord,points,step):
+    if len(points)>1:
+        interval=numpy.diff(points).min()
+    else:
+        interval=0
+        if step!=1 and coord.units.is_time_reference():
+            base=cf_units.Unit(str(coord.units).split(' since ')[0])
+            interval=cf_units.Unit('seconds').convert(step,base)
+    return (points[0]-interval,points[-1])
+
+# Add up a time series of fields, a field at a time
+def accumulate(ax,pe,time_dimension='time',step=1.0):
+    """Sum a time series of fields, over the region shown on an axes.
+
+    The fields are read one at a time, cut down to the axes (:func:`Meteorographica.utils.clip_to_axes`), and added into a single running total, in the plot data type (see :func:`Meteorographica.utils.get_float_dtype`). So only one field (and the total) is ever in memory, however many time steps there are. If pe is a cube with lazy data, each time step is read from it as it is needed.
+
+    Args:
+        ax (:obj:`cartopy.mpl.geoaxes.GeoAxes`): Axes the total is to be plotted on.
+        pe (:obj:`iris.cube.Cube` or iterable of :obj:`iris.cube.Cube`): Fields to add up. Either a cube with dimensions <time_dimension>, 'latitude' and 'longitude', or a sequence (a list, or a generator loading them one at a time) of 2d cubes on the same grid.
+        time_dimension (:obj:`str`, optional): Name of the time dimension of pe. Defaults to 'time'.
+        step (:obj:`float`, optional): Multiply each field by this before adding it in - the time step (in seconds) turns precipitation rates into totals. Defaults to 1 (just add the fields up).
+
+    Returns:
+        :obj:`iris.cube.Cube` - the total, with dimensions latitude and longitude. Masked where any of the fields are masked. The time coordinate is bounded by the accumulation period: from the input time bounds, if there are any, otherwise taking each time point as the end of a time step (so the period starts one step before the first point).
+
+    |
+    """
+
+    total=None
+    time=None
+    for field in _time_steps(pe,time_dimension):
+        field=utils.clip_to_axes(ax,field)
+        data=utils.scaled_data(field,step)
+        if total is None:
+            template=field
+            total=numpy.ma.getdata(data)
+            missing=numpy.ma.getmaskarray(data).copy()
+        else:
+            if data.shape!=total.shape:
+                raise Exception("Fields have different shapes %s %s" %
+                                     (data.shape,total.shape))
+            total+=numpy.ma.getdata(data)
+            missing|=numpy.ma.getmaskarray(data)
+        if field.coords(time_dimension):
+            coord=field.coord(time_dimension)
+            if time is None:
+                time=coord
+                points=[]
+                bounds=[]
+            points.extend(coord.points)
+            # Use the input bounds only if every step has them
+            if bounds is not None and coord.has_bounds():
+                bounds.extend((coord.bounds.min(),coord.bounds.max()))
+            else:
+                bounds=None
+    if total is None:
+        raise Exception("No fields to accumulate")
+
+    if missing.any():
+        total=numpy.ma.masked_array(total,missing)
+    result=template.copy(data=total)
+    # One time coordinate, spanning the whole accumulation period
+    if time is not None:
+        if bounds is not None:
+            start,end=min(bounds),max(bounds)
+        else:
+            start,end=_period(time,numpy.unique(points),step)
+        result.replace_coord(time.copy(points=[(start+end)/2],
+                                       bounds=[[start,end]]))
+        result.add_cell_method(iris.coords.CellMethod('sum',
+                                   coords=time_dimension))
+    return result
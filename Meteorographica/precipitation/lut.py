@@ -0,0 +1,142 @@
+# (C) British Crown Copyright 2017, Met Office
+#
+# This code is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This code is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+
+# Colour a field through a pre-computed RGBA table, instead of having
+#  matplotlib normalise and colour-map it on every draw.
+
+import collections
+import numpy
+import matplotlib
+import matplotlib.cm
+import matplotlib.image
+
+import Meteorographica.utils as utils
+
+# Most recently used colour tables, by colours and alpha
+_luts=collections.OrderedDict()
+_lut_cache_size=8
+
+# Colour table for a colour map
+def rgba_lut(cmap,alpha=1.0,n_colours=256):
+    """RGBA lookup table for a colour map.
+
+    The same colours matplotlib would draw: entry i is the colour for data normalised into bin i of n_colours, with the artist alpha multiplied into the colour map's own alpha. One extra entry, at the end, is the colour map's 'bad' colour (for missing data). Tables are kept for re-use.
+
+    Args:
+        cmap (:obj:`matplotlib.colors.Colormap`): Colour map.
+        alpha (:obj:`float`, optional): Transparency to multiply in. Defaults to 1 (opaque).
+        n_colours (:obj:`int`, optional): Number of colours. Defaults to 256.
+
+    Returns:
+        :obj:`numpy.ndarray` - uint8 array with dimensions (n_colours+1,4).
+
+    |
+    """
+
+    colours=numpy.empty((n_colours+1,4),dtype=numpy.uint8)
+    colours[:-1]=cmap((numpy.arange(n_colours)+0.5)/n_colours,bytes=True)
+    colours[-1]=cmap(numpy.nan,bytes=True)
+    # Key on the colours themselves - a colour map can be changed in
+    #  place, and a new one can get the id of one that has gone.
+    key=(colours.tobytes(),alpha,n_colours)
+    if key in _luts:
+        _luts.move_to_end(key)
+        return _luts[key]
+    lut=colours
+    lut[:,3]=lut[:,3]*alpha
+    _luts[key]=lut
+    if len(_luts)>_lut_cache_size:
+        _luts.popitem(last=False)
+    return lut
+
+# Scale, filter, and bin a field in one pass
+def quantise(data,scale=1.0,sqrt=False,vmin=0.0,vmax=1.0,n_colours=256):
+    """Indices into a colour table for each point in a field.
+
+    Scales the data, optionally takes the square root, normalises to the range vmin:vmax, and bins it into n_colours - all in place in a single working copy, of the plot data type (see :func:`Meteorographica.utils.get_float_dtype`), rather than making a new array at each step. Values below vmin go into the first bin, values above vmax into the last (as matplotlib does by default). Missing (masked or NaN) values get index n_colours - the 'bad' colour in a table from :func:`rgba_lut`.
+
+    Args:
+        data (:obj:`numpy.ndarray`): Field to bin - can be masked.
+        scale (:obj:`float`, optional): Multiply the data by this first. Defaults to 1.
+        sqrt (:obj:`bool`, optional): Take the square root of the scaled data? Defaults to False.
+        vmin (:obj:`float`, optional): Value (after scaling and filtering) at the bottom of the first bin. Defaults to 0.
+        vmax (:obj:`float`, optional): Value (after scaling and filtering) at the top of the last bin. Defaults to 1.
+        n_colours (:obj:`int`, optional): Number of bins. Defaults to 256.
+
+    Returns:
+        :obj:`numpy.ndarray` - bin indices, same shape as data. uint8 if there are fewer than 256 bins, uint16 otherwise.
+
+    |
+    """
+
+    buf=numpy.ma.filled(numpy.ma.asarray(data).astype(utils.get_float_dtype()),
+                    numpy.nan)
+    buf*=scale
+    with numpy.errstate(invalid='ignore'):
+        if sqrt:
+            numpy.sqrt(buf,out=buf)
+        buf-=vmin
+        buf*=n_colours/(vmax-vmin)
+        missing=numpy.isnan(buf)
+        numpy.clip(buf,0,n_colours-1,out=buf)
+    buf[missing]=n_colours
+    dtype=numpy.uint8 if n_colours<256 else numpy.uint16
+    return buf.astype(dtype)
+
+# Draw a field as an image through a colour table
+def lut_image(ax,lons,lats,data,**kwargs):
+    """Draw a field on a regular grid, coloured through a pre-computed RGBA table.
+
+    Gives the same picture as :meth:`matplotlib.axes.Axes.pcolorfast`, but the field is binned by :func:`quantise` and coloured by :func:`rgba_lut` once, here, and matplotlib only gets the finished RGBA image - so there's no normalisation or colour mapping on each draw.
+
+    Args:
+        ax (:obj:`cartopy.mpl.geoaxes.GeoAxes`): Axes on which to draw.
+        lons (:obj:`numpy.ndarray`): Longitudes of the grid points - must be evenly spaced.
+        lats (:obj:`numpy.ndarray`): Latitudes of the grid points - must be evenly spaced.
+        data (:obj:`numpy.ndarray`): Field to draw, with dimensions (latitude,longitude).
+
+    Keyword Args:
+        cmap (:obj:`matplotlib.colors.Colormap`): Colour map. Defaults to None - matplotlib's default.
+        scale (:obj:`float`): Multiply the data by this before plotting. Defaults to 1.
+        sqrt (:obj:`bool`): Take the square root of the scaled data before plotting? Defaults to False.
+        vmin (:obj:`float`): Data value shown with the first colour (after scaling and filtering). Defaults to 0.
+        vmax (:obj:`float`): Data value shown with the last colour (after scaling and filtering). Defaults to 1.
+        alpha (:obj:`float`): transparency to plot at, defaults to 1 (opaque).
+        zorder (:obj:`float`): Standard matplotlib parameter determining which things are plotted on top (high zorder), and which underneath (low zorder), Defaults to 40.
+
+    Returns:
+        :obj:`matplotlib.image.AxesImage` - also adds the image to the plot.
+
+    |
+    """
+
+    kwargs.setdefault('cmap'      ,None)
+    kwargs.setdefault('scale'     ,1.0)
+    kwargs.setdefault('sqrt'      ,False)
+    kwargs.setdefault('vmin'      ,0.0)
+    kwargs.setdefault('vmax'      ,1.0)
+    kwargs.setdefault('alpha'     ,1.0)
+    kwargs.setdefault('zorder'    ,40)
+
+    cmap=matplotlib.cm.ScalarMappable(cmap=kwargs.get('cmap')).get_cmap()
+    lut=rgba_lut(cmap,kwargs.get('alpha'))
+    index=quantise(data,scale=kwargs.get('scale'),sqrt=kwargs.get('sqrt'),
+                   vmin=kwargs.get('vmin'),vmax=kwargs.get('vmax'),
+                   n_colours=len(lut)-1)
+    # Same placement as pcolorfast, for points on a regular grid
+    img=matplotlib.image.AxesImage(ax,data=lut[index],
+                                   extent=(lons[0],lons[-1],lats[0],lats[-1]),
+                                   interpolation='nearest',origin='lower',
+                                   zorder=kwargs.get('zorder'))
+    ax.add_image(img)
+    return img
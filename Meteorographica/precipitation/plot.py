@@ -17,6 +17,8 @@ import matplotlib
 import matplotlib.colors
 
 import Meteorographica.utils as utils
+from .lut import *
+from .accumulate import *
 
 # Define a colour map appropriate for precip plots
 # Dark green with varying transparency
@@ -43,13 +45,15 @@ def plot_cmesh(ax,pe,**kwargs):
 
     Keyword Args:
         raw (:obj:`bool`): If True, plot the colourmap on the native data resolution. If False (default), regrid the data to the given resolution before plotting.
-        resolution (:obj:`float`): What lat:lon resolution (in degrees) to interpolate pe.data to before plotting. Defaults to 0.25.
+        resolution (:obj:`float`): What lat:lon resolution (in degrees) to interpolate pe.data to before plotting. If 'auto', choose it from the figure size, dpi and axes extent (see :func:`Meteorographica.utils.plot_resolution`). Defaults to 0.25.
+        pixels_per_cell (:obj:`float`): With resolution='auto', the size of a grid cell in pixels. Defaults to 1.
         scale (:obj:`float`): This function is tuned for 20CR precip data - rates in Kg*m-2*s-1. For accumulated precip it will be necessary to scale it to an equivalent range. For CERA-20C, try 10. For ERA5, try 10 for enda and 3.6 for oper. Defaults to 1.
         sqrt (:obj:`bool`): Heavy precip (tropical) is so much bigger than light precip that it helps a lot to flatten the distribution before plotting. Apply a square-root filter to the data before plotting? Defaults to True.
         cmap (:obj:`matplotlib.colors.LinearSegmentedColormap`): Mapping of pe.data to plot colour. Defaults to green semi-transparent.
         vmin (:obj:`float`): Data value that is shown as 'no precip' (after scaling and filtering). Increase this to show low-previp as zero instead. Defaults to 0.
         vmax (:obj:`float`): Data value that is shown as 'heavy precip - darkest colour' (after scaling and filtering). Defaults to 0.025 Kg*m-2*s-1.
         alpha (:obj:`float`): transparency to plot at, defaults to 1 (opaque).
+        lut (:obj:`bool`): If True (default), scale, filter and colour the data here, through a pre-computed colour table (see :func:`lut_image`), and give matplotlib a finished RGBA image. If False, or if the grid isn't evenly spaced, leave it to :meth:`matplotlib.axes.Axes.pcolorfast`.
         zorder (:obj:`float`): Standard matplotlib parameter determining which things are plotted on top (high zorder), and which underneath (low zorder), Defaults to 40.
 
     Returns:
@@ -60,27 +64,44 @@ def plot_cmesh(ax,pe,**kwargs):
 
     # Set keyword argument defaults
     kwargs.setdefault('resolution',None)
+    kwargs.setdefault('pixels_per_cell',1)
     kwargs.setdefault('scale'     ,1.0)
     kwargs.setdefault('sqrt'      ,True)
     kwargs.setdefault('cmap'      ,precip_cmap)
     kwargs.setdefault('vmin'      ,0.0)
     kwargs.setdefault('vmax'      ,0.025)
     kwargs.setdefault('alpha'     ,1.0)
+    kwargs.setdefault('lut'       ,True)
     kwargs.setdefault('zorder'    ,40)
  
+    kwargs['resolution']=utils.plot_resolution(ax,kwargs.get('resolution'),
+                                       kwargs.get('pixels_per_cell'))
+    pe=utils.clip_to_axes(ax,pe)
     if kwargs.get('resolution') is None:
         cmesh_p=pe
     else:
         plot_cube=utils.dummy_cube(ax,kwargs.get('resolution'))
-        cmesh_p = pe.regrid(plot_cube,iris.analysis.Linear())
-
-    cmesh_p.data=cmesh_p.data*kwargs.get('scale')
-    if kwargs.get('sqrt'):
-        cmesh_p.data=numpy.sqrt(cmesh_p.data)
+        cmesh_p = utils.regrid(pe,plot_cube)
 
     lats = cmesh_p.coord('latitude').points
     lons = cmesh_p.coord('longitude').points
-    prate_img=ax.pcolorfast(lons, lats, cmesh_p.data, 
+    if (kwargs.get('lut') and utils.evenly_spaced(lats) and
+        utils.evenly_spaced(lons) and
+        cmesh_p.coord_dims('latitude')[0]<cmesh_p.coord_dims('longitude')[0]):
+        return lut_image(ax,lons,lats,utils.cube_data(cmesh_p),
+                         cmap=kwargs.get('cmap'),
+                         scale=kwargs.get('scale'),
+                         sqrt=kwargs.get('sqrt'),
+                         vmin=kwargs.get('vmin'),
+                         vmax=kwargs.get('vmax'),
+                         alpha=kwargs.get('alpha'),
+                         zorder=kwargs.get('zorder'))
+
+    cmesh_data=utils.scaled_data(cmesh_p,kwargs.get('scale'))
+    if kwargs.get('sqrt'):
+        with numpy.errstate(invalid='ignore'):
+            numpy.sqrt(cmesh_data,out=cmesh_data)
+    prate_img=ax.pcolorfast(lons, lats, cmesh_data, 
                             cmap=kwargs.get('cmap'),
                             vmin=kwargs.get('vmin'),
                             vmax=kwargs.get('vmax'),
@@ -88,6 +109,35 @@ def plot_cmesh(ax,pe,**kwargs):
                             zorder=kwargs.get('zorder'))
     return prate_img
 
+# Plot the total of a time series of fields
+def plot_accumulation(ax,pe,**kwargs):
+    """Plots the total of a time series of precipitation fields as a colour map.
+
+    The fields are added up by :func:`accumulate` - one time step at a time, so memory use doesn't grow with the number of steps - and the total is plotted by :func:`plot_cmesh`.
+
+    Args:
+        ax (:obj:`cartopy.mpl.geoaxes.GeoAxes`): Axes on which to draw.
+        pe (:obj:`iris.cube.Cube` or iterable of :obj:`iris.cube.Cube`): Fields to add up - see :func:`accumulate`.
+
+    Keyword Args:
+        time_dimension (:obj:`str`): Name of the time dimension of pe. Defaults to 'time'.
+        step (:obj:`float`): Multiply each field by this before adding it in - e.g. the time step in seconds, for precipitation rates. Defaults to 1.
+        Other keyword arguments are passed to :func:`plot_cmesh` - the defaults there are for rates, so set vmax (or scale) to suit the totals.
+
+    Returns:
+        See :func:`plot_cmesh` - also adds the image to the plot.
+
+    |
+    """
+
+    kwargs.setdefault('time_dimension','time')
+    kwargs.setdefault('step'          ,1.0)
+
+    total=accumulate(ax,pe,
+                     time_dimension=kwargs.pop('time_dimension'),
+                     step=kwargs.pop('step'))
+    return plot_cmesh(ax,total,**kwargs)
+
 
 
 
@@ -99,11 +149,11 @@ def plot(ax,pe,**kwargs):
 
     Args:
         ax (:obj:`cartopy.mpl.geoaxes.GeoAxes`): Axes on which to draw.
-        pe (:obj:`iris.cube.Cube`): Variable to plot - must be 2d, with dimensions latitude and longitude.
+        pe (:obj:`iris.cube.Cube`): Variable to plot - must be 2d, with dimensions latitude and longitude (for 'accumulation', a time series - see :func:`accumulate`).
 
 
     Keyword Args:
-        type (:obj:`str`): Style to plot. Default is 'cmap', which delegates plotting to :meth:`plot_cmesh` and at the moment this is the only choice. 
+        type (:obj:`str`): Style to plot. Default is 'cmesh', which delegates plotting to :meth:`plot_cmesh`. 'accumulation' plots the total of a time series of fields, and delegates plotting to :meth:`plot_accumulation`.
         Other keyword arguments are passed to the style-specific plotting function.
 
     |
@@ -113,6 +163,8 @@ def plot(ax,pe,**kwargs):
 
     if kwargs.get('type')=='cmesh':
         return plot_cmesh(ax,pe,**kwargs)
+    if kwargs.get('type')=='accumulation':
+        return plot_accumulation(ax,pe,**kwargs)
 
     raise Exception('Unsupported precipitation plot type %s' %
                          kwargs.get('type'))
@@ -12,3 +12,6 @@
 #
 
 from .plot import *
+from .probability import *
+from .lines import *
+from .labels import *
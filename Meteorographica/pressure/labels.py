@@ -0,0 +1,169 @@
+# (C) British Crown Copyright 2017, Met Office
+#
+# This code is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This code is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+
+import numpy
+import scipy.spatial
+
+from .lines import _contour_segments
+
+def make_label_hints(ax,CS):
+    """Make hints for the contour label placement algorithm - these stabilise the positions of the contour labels between frames in videos. They don't eliminate the problem of jittery and flickering contour labels, but they do help.
+
+    Args:
+        ax (:obj:`cartopy.mpl.geoaxes.GeoAxes`): Axes on which to draw.
+        CS (:obj:`matplotlib.contour.ContourSet`): Contours to be labeled.
+
+    Returns:
+        iterable of (x,y) tuples - each a position hint for a label.
+
+    |
+    """
+
+    edges=_label_edges(ax)
+    label_locations=[]
+    for segments in _contour_segments(CS):
+        for segment in segments:
+            label_locations.extend(_segment_hints(segment,edges))
+
+    return label_locations
+
+# Lines (and direction) to look for label spots on
+def _label_edges(ax):
+    extent=ax.get_extent()
+    buffer=(extent[1]-extent[0])/20.0
+    return ((0,extent[0]+buffer),  # left
+            (0,extent[1]-buffer),  # right
+            (1,extent[2]+buffer),  # bottom
+            (1,extent[3]-buffer))  # top
+
+# Find suitable spots to label a contour segment
+def _segment_hints(segment,edges):
+    segment=numpy.asarray(segment)
+    if len(segment)==0: return []
+    hits=[_edge_crossing(segment,axis,value) for axis,value in edges]
+    left_edge,right_edge,bottom_edge,top_edge=hits
+    label_locations=[]
+    if left_edge is not None:
+        label_locations.append(left_edge)
+    if right_edge is not None:
+        label_locations.append(right_edge)
+    if left_edge is None and right_edge is None:
+        if bottom_edge is not None:
+            label_locations.append(bottom_edge)
+        if top_edge is not None:
+            label_locations.append(top_edge)
+        if bottom_edge is None and top_edge is None:
+            bp=numpy.argmin(segment[:,1])
+            label_locations.append((segment[bp,0],segment[bp,1]))
+    return label_locations
+
+# First place where a contour segment crosses a line of constant
+#  x (axis=0) or y (axis=1), going either way. Returns None if there
+#  is no crossing.
+def _edge_crossing(segment,axis,value):
+    v=segment[:,axis]
+    w=segment[:,1-axis]
+    inside=v>=value
+    # Crossings from the previous point, and to the next point -
+    #  at the same point, a crossing from the previous one takes priority.
+    from_previous=numpy.flatnonzero(inside[1:] & ~inside[:-1])+1
+    to_next=numpy.flatnonzero(inside[:-1] & ~inside[1:])
+    if len(from_previous)==0 and len(to_next)==0:
+        return None
+    if len(to_next)==0 or (len(from_previous)>0 and
+                           from_previous[0]<=to_next[0]):
+        si=from_previous[0]
+        ni=si-1
+    else:
+        si=to_next[0]
+        ni=si+1
+    weight=(v[si]-value)/(v[si]-v[ni])
+    crossing=w[si]+(w[si]-w[ni])*weight
+    if axis==0:
+        return (value,crossing)
+    return (crossing,value)
+
+# Keep label positions from one video frame to the next
+class LabelTracker(object):
+    """Stable contour label positions for videos.
+
+    :meth:`make_label_hints` starts from scratch every frame, so the labels still jitter. A tracker remembers where the labels were in the last frame, and moves each one to the nearest point on the same contour level in the new frame (found with a :class:`scipy.spatial.cKDTree` of the contour vertices for each level). Only contours that have no surviving label (new contours, or ones that moved too far) get fresh hints from :meth:`make_label_hints`.
+
+    Use one tracker for the whole video, and pass it to :meth:`plot_contour` with label='video'.
+
+    Args:
+        max_shift (:obj:`float`, optional): Furthest a label can move between frames (in axes coordinates - degrees). Labels which would move further are dropped and their contours relabeled. Defaults to None - 1/50th of the width of the axes.
+
+    |
+    """
+
+    def __init__(self,max_shift=None):
+        self.max_shift=max_shift
+        self.positions={}  # level -> (n,2) array of label positions
+
+    def reset(self):
+        """Forget all the label positions - start again as if this were the first frame."""
+        self.positions={}
+
+    def make_label_hints(self,ax,CS):
+        """Make label position hints for a new frame, and remember them for the next.
+
+        Args:
+            ax (:obj:`cartopy.mpl.geoaxes.GeoAxes`): Axes on which to draw.
+            CS (:obj:`matplotlib.contour.ContourSet`): Contours to be labeled.
+
+        Returns:
+            iterable of (x,y) tuples - each a position hint for a label.
+
+        |
+        """
+
+        extent=ax.get_extent()
+        max_shift=self.max_shift
+        if max_shift is None:
+            max_shift=(extent[1]-extent[0])/50.0
+        edges=_label_edges(ax)
+
+        positions={}
+        for level,segments in zip(CS.levels,_contour_segments(CS)):
+            segments=[numpy.asarray(s) for s in segments if len(s)>0]
+            if len(segments)==0: continue
+            vertices=numpy.concatenate(segments)
+            segment_ids=numpy.repeat(numpy.arange(len(segments)),
+                                     [len(s) for s in segments])
+            level_positions=[]
+            labelled=numpy.zeros(len(segments),dtype=bool)
+
+            # Move the old labels onto the nearest point of the new contours
+            old=self.positions.get(level)
+            if old is not None:
+                distance,nearest=scipy.spatial.cKDTree(vertices).query(old)
+                nearest=numpy.unique(nearest[distance<=max_shift])
+                moved=vertices[nearest]
+                visible=((moved[:,0]>=extent[0]) & (moved[:,0]<=extent[1]) &
+                         (moved[:,1]>=extent[2]) & (moved[:,1]<=extent[3]))
+                level_positions.extend(moved[visible])
+                labelled[segment_ids[nearest[visible]]]=True
+
+            # Fresh hints for the contours without a label
+            for si in numpy.flatnonzero(~labelled):
+                level_positions.extend(_segment_hints(segments[si],edges))
+
+            if len(level_positions)>0:
+                positions[level]=numpy.array(level_positions,dtype=float)
+
+        self.positions=positions
+        label_locations=[]
+        for level_positions in positions.values():
+            label_locations.extend(tuple(p) for p in level_positions)
+        return label_locations
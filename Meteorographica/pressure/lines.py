@@ -0,0 +1,144 @@
+# (C) British Crown Copyright 2017, Met Office
+#
+# This code is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This code is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+
+import numpy
+import matplotlib
+import matplotlib.colors
+import matplotlib.collections
+import matplotlib.path
+
+import Meteorographica.utils as utils
+
+# Vertices of the lines in a ContourSet, level by level, after any
+#  gaps clabel has cut for inline labels. Older matplotlib has a
+#  collection for each level, newer makes the ContourSet itself a
+#  collection with one path for each level.
+def _contour_segments(CS):
+    if isinstance(CS,matplotlib.collections.Collection):
+        paths=[[path] for path in CS.get_paths()]
+    else:
+        paths=[collection.get_paths() for collection in CS.collections]
+    allsegs=[]
+    for level_paths in paths:
+        segments=[]
+        for path in level_paths:
+            if path.codes is None:
+                segments.append(path.vertices)
+                continue
+            starts=numpy.where(path.codes==matplotlib.path.Path.MOVETO)[0]
+            segments.extend(numpy.split(path.vertices,starts[1:]))
+        allsegs.append(segments)
+    return allsegs
+
+# Opacity of contour lines and labels, as a function of local spread
+def _spread_alpha(spread,line_threshold):
+    return numpy.sqrt(numpy.maximum(0.04,1-spread/line_threshold))
+
+# Draw contour lines with a transparency dependent on the local spread
+def plot_faded_lines(ax,CS,pe_s,**kwargs):
+    """Draw contour lines, fading them out where the ensemble spread is large.
+
+    Each line segment gets its own alpha, from the spread at the midpoint of the segment. All the segments of one contour level go into a single :class:`matplotlib.collections.LineCollection`, and the spread at all the segment midpoints is found with a single batched interpolation (:func:`Meteorographica.utils.sample_points`).
+
+    Args:
+        ax (:obj:`cartopy.mpl.geoaxes.GeoAxes`): Axes on which to draw.
+        CS (:obj:`matplotlib.contour.ContourSet`): Contours to be drawn - only the geometry is used (including any gaps left for inline labels).
+        pe_s (:obj:`iris.cube.Cube`): Ensemble spread - must have dimensions 'latitude' and 'longitude'.
+
+    Keyword Args:
+        colors (see :mod:`matplotlib.colors`) contour line colour. Defaults to 'black'.
+        linewidths (:obj:`float`): Line width for contour lines. Defaults to 0.5.
+        line_threshold (:obj:`float`): Only draw contours where the local standard deviation is less than this. Defaults to None - draw contours everywhere.
+        alpha (:obj:`float`): Colour alpha blend. Defaults to 1 (opaque).
+        zorder (:obj:`float`): Standard matplotlib parameter determining which things are plotted on top (high zorder), and which underneath (low zorder), Defaults to 40.
+
+    Returns:
+        :obj:`list` of :obj:`matplotlib.collections.LineCollection` - one for each contour level. Also adds the lines to the plot.
+
+    |
+    """
+
+    kwargs.setdefault('colors'        ,'black')
+    kwargs.setdefault('linewidths'    ,0.5)
+    kwargs.setdefault('line_threshold',None)
+    kwargs.setdefault('alpha'         ,1.0)
+    kwargs.setdefault('zorder'        ,40)
+
+    # Split every contour into (start,end) pairs of points
+    lines=[]
+    for segments in _contour_segments(CS):
+        segments=[s for s in segments if len(s)>1]
+        if len(segments)==0:
+            lines.append(numpy.zeros((0,2,2)))
+            continue
+        starts=numpy.concatenate([s[:-1] for s in segments])
+        ends=numpy.concatenate([s[1:] for s in segments])
+        lines.append(numpy.stack((starts,ends),axis=1))
+
+    base_col=matplotlib.colors.colorConverter.to_rgb(kwargs.get('colors'))
+    n_lines=[len(l) for l in lines]
+    alphas=numpy.full(sum(n_lines),kwargs.get('alpha'))
+    if kwargs.get('line_threshold') is not None and sum(n_lines)>0:
+        midpoints=numpy.concatenate(lines).mean(axis=1)
+        local_spread=numpy.ma.filled(utils.sample_points(pe_s,
+                                        midpoints[:,1],midpoints[:,0],
+                                        dtype=numpy.float64),numpy.nan)
+        alphas*=_spread_alpha(local_spread,kwargs.get('line_threshold'))
+
+    collections=[]
+    for level_lines,level_alphas in zip(lines,
+                                        numpy.split(alphas,
+                                                    numpy.cumsum(n_lines)[:-1])):
+        clr=numpy.empty((len(level_lines),4))
+        clr[:,0:3]=base_col
+        clr[:,3]=level_alphas
+        lc=matplotlib.collections.LineCollection(level_lines,
+                                colors=clr,
+                                linestyle='solid',
+                                linewidths=kwargs.get('linewidths'),
+                                zorder=kwargs.get('zorder'))
+        ax.add_collection(lc,autolim=False)
+        collections.append(lc)
+
+    return collections
+
+# Fade contour labels according to the local spread
+def fade_labels(labels,pe_s,**kwargs):
+    """Set the transparency of contour labels from the local ensemble spread.
+
+    Args:
+        labels (:obj:`list` of :obj:`matplotlib.text.Text`): Labels, as returned by :meth:`matplotlib.axes.Axes.clabel`.
+        pe_s (:obj:`iris.cube.Cube`): Ensemble spread - must have dimensions 'latitude' and 'longitude'.
+
+    Keyword Args:
+        line_threshold (:obj:`float`): Spread at which labels are fully faded. Defaults to None - don't fade.
+        alpha (:obj:`float`): Colour alpha blend. Defaults to 1 (opaque).
+
+    Returns:
+        Nothing - modifies the labels.
+
+    |
+    """
+
+    kwargs.setdefault('line_threshold',None)
+    kwargs.setdefault('alpha'         ,1.0)
+
+    if kwargs.get('line_threshold') is None or len(labels)==0:
+        return
+    positions=numpy.array([label.get_position() for label in labels])
+    local_spread=numpy.ma.filled(utils.sample_points(pe_s,
+                                    positions[:,1],positions[:,0],
+                                    dtype=numpy.float64),numpy.nan)
+    alpha_s=_spread_alpha(local_spread,kwargs.get('line_threshold'))
+    for label,a in zip(labels,alpha_s):
+        label.set_alpha(kwargs.get('alpha')*a)
@@ -15,9 +15,13 @@ import numpy
 import iris
 import matplotlib
 import matplotlib.colors
-import scipy
+import matplotlib.collections
+import matplotlib.contour
 
 import Meteorographica.utils as utils
+from .probability import *
+from .lines import *
+from .labels import *
 
 # Plot a single field as a standard contour plot
 def plot_contour(ax,pe,**kwargs):
@@ -31,8 +35,11 @@ def plot_contour(ax,pe,**kwargs):
 
     Keyword Args:
         label (:obj:`bool`): Label contour lines? Defaults to False. If it's 'video' use stablised label locations.
-        resolution (:obj:`float`): What lat:lon resolution (in degrees) to interpolate pe.data to before plotting. Defaults to None - use original resolution.
+        label_tracker (:obj:`LabelTracker`): With label='video', keep the label locations stable from frame to frame by passing the same tracker for every frame. Defaults to None - make new hints each frame with :meth:`make_label_hints`.
+        resolution (:obj:`float`): What lat:lon resolution (in degrees) to interpolate pe.data to before plotting. If 'auto', choose it from the figure size, dpi and axes extent (see :func:`Meteorographica.utils.plot_resolution`). Defaults to None - use original resolution.
+        pixels_per_cell (:obj:`float`): With resolution='auto', the size of a grid cell in pixels. Defaults to 2.
         scale (:obj:`float`): This function is tuned for data in hPa. For data in Pa, set this to 0.01. Defaults to 1.
+        cache (:obj:`Meteorographica.utils.ContourCache`): Keep the contour lines on disk, and re-use them when the same field is plotted again. Defaults to None - calculate the lines every time.
         colors (see :mod:`matplotlib.colors`) contour line colour. Defaults to 'black'.
         linewidths (:obj:`float`): Line width for contour lines. Defaults to 0.5.
         alpha (:obj:`float`): Colour alpha blend. Defaults to 1 (opaque).
@@ -47,7 +54,10 @@ def plot_contour(ax,pe,**kwargs):
 
     kwargs.setdefault('raw'        ,False)
     kwargs.setdefault('label'      ,True)
+    kwargs.setdefault('label_tracker',None)
+    kwargs.setdefault('cache'      ,None)
     kwargs.setdefault('resolution' ,None)
+    kwargs.setdefault('pixels_per_cell',2)
     kwargs.setdefault('scale'      ,1.0)
     kwargs.setdefault('colors'     ,'black')
     kwargs.setdefault('alpha'      ,1.0)
@@ -56,27 +66,28 @@ def plot_contour(ax,pe,**kwargs):
     kwargs.setdefault('levels'     ,numpy.arange(870,1050,10))
     kwargs.setdefault('zorder'     ,30)
 
+    kwargs['resolution']=utils.plot_resolution(ax,kwargs.get('resolution'),
+                                       kwargs.get('pixels_per_cell'))
+    pe=utils.clip_to_axes(ax,pe)
     if kwargs.get('resolution') is None:
         contour_p=pe
     else:
         plot_cube=utils.dummy_cube(ax,kwargs.get('resolution'))
-        contour_p = pe.regrid(plot_cube,iris.analysis.Linear())
+        contour_p = utils.regrid(pe,plot_cube)
 
-    contour_p.data=contour_p.data*kwargs.get('scale')
+    contour_data=utils.scaled_data(contour_p,kwargs.get('scale'))
     lats = contour_p.coord('latitude').points
     lons = contour_p.coord('longitude').points
-    lons,lats = numpy.meshgrid(lons,lats)
-    CS=ax.contour(lons, lats, contour_p.data,
-                               colors=kwargs.get('colors'),
-                               linewidths=kwargs.get('linewidths'),
-                               alpha=kwargs.get('alpha'),
-                               levels=kwargs.get('levels'),
-                               zorder=kwargs.get('zorder'))
+    CS=_contour(ax,lons,lats,contour_data,**kwargs)
 
     # Label the contours
     if kwargs.get('label')=='video':
+        if kwargs.get('label_tracker') is not None:
+            hints=kwargs.get('label_tracker').make_label_hints(ax,CS)
+        else:
+            hints=make_label_hints(ax,CS)
         cl=ax.clabel(CS, inline=1, fontsize=kwargs.get('fontsize'),
-                     manual=make_label_hints(ax,CS),
+                     manual=hints,
                      fmt='%d',zorder=kwargs.get('zorder'))
     elif kwargs.get('label'):
         cl=ax.clabel(CS, inline=1, fontsize=kwargs.get('fontsize'),
@@ -85,11 +96,29 @@ def plot_contour(ax,pe,**kwargs):
     return CS
 
 
+# Make a ContourSet - using the contour geometry cache if there is one
+def _contour(ax,lons,lats,data,**kwargs):
+    if kwargs.get('cache') is None:
+        lons,lats = numpy.meshgrid(lons,lats)
+        return ax.contour(lons, lats, data,
+                               colors=kwargs.get('colors'),
+                               linewidths=kwargs.get('linewidths'),
+                               alpha=kwargs.get('alpha'),
+                               levels=kwargs.get('levels'),
+                               zorder=kwargs.get('zorder'))
+    allsegs=utils.cached_contours(kwargs.get('cache'),lons,lats,data,
+                                  kwargs.get('levels'),ax.projection)
+    return matplotlib.contour.ContourSet(ax,kwargs.get('levels'),allsegs,
+                               colors=kwargs.get('colors'),
+                               linewidths=kwargs.get('linewidths'),
+                               alpha=kwargs.get('alpha'),
+                               zorder=kwargs.get('zorder'))
+
 # Plot a set of fields as a spaghetti plot
 def plot_spaghetti_contour(ax,pe,**kwargs):
     """Plots a multi-contour (spaghetti) plot.
 
-    Calls :meth:`plot_pressure_contour` multiple times with sensible defaults colurs and styles
+    By default, calls :meth:`plot_contour` for each member. With batched=True (and no labels), all the members are contoured together instead: the ensemble is regridded once, as a single array, the contour lines for each member are calculated directly (without making a :class:`matplotlib.contour.ContourSet` for each), and all the lines for each contour level are drawn as one :class:`matplotlib.collections.LineCollection` - much faster for large ensembles.
 
     Args:
         ax (:obj:`cartopy.mpl.geoaxes.GeoAxes`): Axes on which to draw.
@@ -100,10 +129,12 @@ def plot_spaghetti_contour(ax,pe,**kwargs):
         colors (see :mod:`matplotlib.colors`) contour line colour. Defaults to 'blue'.
         linewidths (:obj:`float`): Line width for contour lines. Defaults to 0.2.
         label (:obj:`bool`): Label contour lines? Defaults to False.
-        Other keyword arguments are passed to :meth:`plot_pressure_contour`
+        batched (:obj:`bool`): Contour all the members together? Changes the return value (see below). Defaults to False (ignored if label is set).
+        workers (:obj:`int`): Trace the members' contours in a pool of this many processes - only with batched contouring, setting it otherwise is an error. Defaults to None - use this process only.
+        Other keyword arguments are passed to :meth:`plot_contour`
 
     Returns:
-        See :meth:`matplotlib.axes.Axes.contour` - except it's an array, one for each member. Also adds the lines to the plot.
+        If batched, a list of :obj:`matplotlib.collections.LineCollection`, one for each contour level. Otherwise see :meth:`matplotlib.axes.Axes.contour` - except it's an array, one for each member. Also adds the lines to the plot.
 
     |
     """  
@@ -112,6 +143,14 @@ def plot_spaghetti_contour(ax,pe,**kwargs):
     kwargs.setdefault('colors'            ,'blue')
     kwargs.setdefault('linewidths'        ,0.1)
     kwargs.setdefault('label'             ,False)
+    kwargs.setdefault('batched'           ,False)
+    kwargs.setdefault('workers'           ,None)
+
+    if kwargs.get('batched') and not kwargs.get('label'):
+        return _plot_spaghetti_lines(ax,pe,**kwargs)
+    # Only batched contouring can use a pool - don't quietly go serial
+    if kwargs.get('workers') is not None:
+        raise Exception("workers needs batched=True (and no labels)")
 
     CS=[]
     for m in pe.coord(kwargs.get('ensemble_dimension')).points:
@@ -120,6 +159,47 @@ def plot_spaghetti_contour(ax,pe,**kwargs):
 
     return CS
 
+# Contour all the members of an ensemble at once, and draw all the lines
+#  at each level as a single LineCollection.
+def _plot_spaghetti_lines(ax,pe,**kwargs):
+
+    kwargs.setdefault('resolution' ,None)
+    kwargs.setdefault('pixels_per_cell',2)
+    kwargs.setdefault('scale'      ,1.0)
+    kwargs.setdefault('alpha'      ,1.0)
+    kwargs.setdefault('levels'     ,numpy.arange(870,1050,10))
+    kwargs.setdefault('zorder'     ,30)
+
+    kwargs['resolution']=utils.plot_resolution(ax,kwargs.get('resolution'),
+                                       kwargs.get('pixels_per_cell'))
+    pe=utils.clip_to_axes(ax,pe)
+    if kwargs.get('resolution') is not None:
+        plot_cube=utils.dummy_cube(ax,kwargs.get('resolution'))
+        pe = utils.regrid(pe,plot_cube)
+
+    # Data as a (member,latitude,longitude) array
+    dims=[pe.coord_dims(kwargs.get('ensemble_dimension'))[0],
+          pe.coord_dims('latitude')[0],
+          pe.coord_dims('longitude')[0]]
+    data=numpy.ma.transpose(utils.scaled_data(pe,kwargs.get('scale')),dims)
+    lats = pe.coord('latitude').points
+    lons = pe.coord('longitude').points
+
+    allsegs=utils.trace_ensemble_contours(lons,lats,data,
+                                          kwargs.get('levels'),
+                                          workers=kwargs.get('workers'))
+    collections=[]
+    for segments in allsegs:
+        lc=matplotlib.collections.LineCollection(segments,
+                                colors=kwargs.get('colors'),
+                                linewidths=kwargs.get('linewidths'),
+                                alpha=kwargs.get('alpha'),
+                                zorder=kwargs.get('zorder'))
+        ax.add_collection(lc,autolim=False)
+        collections.append(lc)
+
+    return collections
+
 mean_contour_cmap= matplotlib.colors.LinearSegmentedColormap('mc_cmap',
                       {'red'   : ((0.0, 0.0, 0.0), 
                                   (1.0, 0.0, 0.0)), 
@@ -134,15 +214,19 @@ mean_contour_cmap= matplotlib.colors.LinearSegmentedColormap('mc_cmap',
 def plot_mean_spread(ax,pe,**kwargs):
     """Plots a variable as a contour plot.
 
-    Plots contours of the mean of an ensemble, mark uncertainty by fading out the contours where the ensemble spread is large.
+    Plots contours of the mean of an ensemble, mark uncertainty by fading out the contours where the ensemble spread is large. The mean and spread are calculated in a single pass through the ensemble, a few members at a time (see :func:`Meteorographica.utils.ensemble_mean_spread`).
 
     Args:
         ax (:obj:`cartopy.mpl.geoaxes.GeoAxes`): Axes on which to draw.
-        pe (:obj:`iris.cube.Cube`): Variable to plot.- must have dimensions <ensemble_dimension>, 'latitude' and 'longitude'.
+        pe (:obj:`iris.cube.Cube`): Variable to plot.- must have dimensions <ensemble_dimension>, 'latitude' and 'longitude'. Can be None if mean_spread is given.
 
     Keyword Args:
         ensemble_dimension (:obj:`float`): name of the ensemble dimension. Defaults to 'member'.
-        resolution (:obj:`float`): What lat:lon resolution (in degrees) to interpolate pe.data to before plotting. Defaults to None - use original resolution.
+        mean_spread (:obj:`tuple` of :obj:`iris.cube.Cube`): Precomputed ensemble mean and standard deviation - the output of :func:`Meteorographica.utils.ensemble_mean_spread`. Defaults to None - calculate them from pe.
+        chunk_size (:obj:`int`): Number of ensemble members to read at once when calculating the mean and spread. Defaults to 8.
+        resolution (:obj:`float`): What lat:lon resolution (in degrees) to interpolate pe.data to before plotting. If 'auto', choose it from the figure size, dpi and axes extent (see :func:`Meteorographica.utils.plot_resolution`). Defaults to None - use original resolution.
+        pixels_per_cell (:obj:`float`): With resolution='auto', the size of a grid cell in pixels. Defaults to 2.
+        cache (:obj:`Meteorographica.utils.ContourCache`): Keep the mean contour lines on disk, and re-use them when the same field is plotted again. Defaults to None - calculate the lines every time.
         colors (see :mod:`matplotlib.colors`) contour line colour. Defaults to 'black'.
         linewidths (:obj:`float`): Line width for contour lines. Defaults to 0.2.
         label (:obj:`bool`): Label contour lines? Defaults to False.
@@ -163,7 +247,11 @@ def plot_mean_spread(ax,pe,**kwargs):
 
     kwargs.setdefault('label'             ,True)
     kwargs.setdefault('ensemble_dimension','member')
+    kwargs.setdefault('mean_spread'       ,None)
+    kwargs.setdefault('chunk_size'        ,8)
+    kwargs.setdefault('cache'             ,None)
     kwargs.setdefault('resolution'        ,None)
+    kwargs.setdefault('pixels_per_cell'   ,2)
     kwargs.setdefault('scale'             ,1.0)
     kwargs.setdefault('cmap'              ,mean_contour_cmap)
     kwargs.setdefault('colors'            ,'black')
@@ -176,22 +264,29 @@ def plot_mean_spread(ax,pe,**kwargs):
     kwargs.setdefault('line_threshold'    ,None)
     kwargs.setdefault('zorder'            ,40)
 
-    pe.data=pe.data*kwargs.get('scale')
-    pe_m=pe.collapsed(kwargs.get('ensemble_dimension'), iris.analysis.MEAN)
-    pe_s=pe.collapsed(kwargs.get('ensemble_dimension'), iris.analysis.STD_DEV)
+    kwargs['resolution']=utils.plot_resolution(ax,kwargs.get('resolution'),
+                                       kwargs.get('pixels_per_cell'))
+    if kwargs.get('mean_spread') is None:
+        pe=utils.clip_to_axes(ax,pe)
+        pe_m,pe_s=utils.ensemble_mean_spread(pe,
+                            ensemble_dimension=kwargs.get('ensemble_dimension'),
+                            chunk_size=kwargs.get('chunk_size'))
+    else:
+        pe_m,pe_s=[utils.clip_to_axes(ax,c) for c in kwargs.get('mean_spread')]
+    # Scale the results, not the input - don't change the caller's cube
+    pe_m=pe_m.copy(data=utils.as_float(pe_m.core_data())*kwargs.get('scale'))
+    pe_s=pe_s.copy(data=utils.as_float(pe_s.core_data())*
+                        abs(kwargs.get('scale')))
 
     if kwargs.get('resolution') is not None:
         plot_cube=utils.dummy_cube(ax,kwargs.get('resolution'))
-        pe_m=pe_m.regrid(plot_cube,iris.analysis.Linear())
-        pe_s=pe_s.regrid(plot_cube,iris.analysis.Linear())
+        pe_m=utils.regrid(pe_m,plot_cube)
+        pe_s=utils.regrid(pe_s,plot_cube)
 
     # Estimate, at each point, the probability that a contour goes through it.
-    pe_u = pe_m.copy()
-    pe_u.data=pe_m.data*0.0
-    pe_t = pe_u.copy()
-    for level in kwargs.get('levels'):
-        pe_t.data=1-scipy.stats.norm.cdf(numpy.absolute(pe_m.data-level)/pe_s.data)
-        pe_u.data=numpy.maximum(pe_u.data,pe_t.data)
+    pe_u = pe_m.copy(data=contour_probability(pe_m.data,pe_s.data,
+                                              kwargs.get('levels'),
+                                              dtype=utils.get_float_dtype()))
     # Plot this probability as a colormap
     lats = pe_u.coord('latitude').points
     lons = pe_u.coord('longitude').points
@@ -202,52 +297,19 @@ def plot_mean_spread(ax,pe,**kwargs):
                          zorder=kwargs.get('zorder')-1)
 
     # Generate the mean contour lines, but don't draw them (linewidth=0)
-    CS=ax.contour(lons, lats, pe_m.data,
-                               colors=kwargs.get('colors'),
-                               linewidths=0,
-                               alpha=kwargs.get('alpha'),
-                               levels=kwargs.get('levels'),
-                               zorder=kwargs.get('zorder'))
+    CS=_contour(ax,lons,lats,pe_m.data,
+                **dict(kwargs,linewidths=0))
 
     # Label the mean contours - transparency dependent on spread
-    interpolator = iris.analysis.Linear().interpolator(pe_s, 
-                                   ['latitude', 'longitude'])
     if kwargs.get('label'):
         cl=ax.clabel(CS, inline=1, 
                      fontsize=kwargs.get('fontsize'),
                      fmt='%d',
                      zorder=kwargs.get('zorder')+1)
-        if kwargs.get('line_threshold') is not None:
-            for label in cl:
-                pos=label.get_position()
-                local_spread=interpolator([pos[1],pos[0]]).data
-                alpha_s=numpy.sqrt(max(0.04,1-local_spread/
-                                              kwargs.get('line_threshold')))
-                label.set_alpha(kwargs.get('alpha')*alpha_s)
+        fade_labels(cl,pe_s,**kwargs)
 
     # Draw the mean contours, with transparency dependent on spread
-    base_col=matplotlib.colors.colorConverter.to_rgb(kwargs.get('colors'))
-    for collection in CS.collections: 
-        segments=collection.get_segments()
-        for segment in segments:  
-            for idx in range(segment.shape[0]-1):
-                alpha_s=1
-                if kwargs.get('line_threshold') is not None:
-                    local_spread=interpolator(
-                          [(segment[idx,1]+segment[idx+1,1])/2.0,
-                           (segment[idx,0]+segment[idx+1,0])/2.0]).data
-                    alpha_s=numpy.sqrt(max(0.04,1-local_spread/
-                                                  kwargs.get('line_threshold')))
-                clr=(base_col[0],
-                     base_col[1],
-                     base_col[2],kwargs.get('alpha')*alpha_s)
-                ax.add_line(matplotlib.lines.Line2D(
-                                xdata=segment[idx:(idx+2),0],
-                                ydata=segment[idx:(idx+2),1],
-                                linestyle='solid',
-                                linewidth=kwargs.get('linewidths'),
-                                color=clr,
-                                zorder=kwargs.get('zorder')))      
+    plot_faded_lines(ax,CS,pe_s,**kwargs)
 
     return CS
     
@@ -284,109 +346,3 @@ def plot(ax,pe,**kwargs):
 
     raise Exception('Unsupported pressure plot type %s' %
                          kwargs.get('type'))
-
-
-def make_label_hints(ax,CS):
-    """Make hints for the contour label placement algorithm - these stabilise the positions of the contour labels between frames in videos. They don't eliminate the problem of jittery and flickering contour labels, but they do help.
-
-    Args:
-        ax (:obj:`cartopy.mpl.geoaxes.GeoAxes`): Axes on which to draw.
-        CS (:obj:`matplotlib.contour.ContourSet`): Contours to be labeled.
-
-    Returns:
-        iterable of (x,y) tuples - each a position hint for a label.
-
-    |
-    """
-
-    label_locations=[]
-    buffer=(ax.get_extent()[1]-ax.get_extent()[0])/20.0
-    for collection in CS.collections: 
-        segments=collection.get_segments()
-        for segment in segments:
-            left_edge=None
-            right_edge=None
-            bottom_edge=None
-            top_edge=None
-            bottom_point=None
-          # Find a suitable spot to label the segment
-            for si in range(len(segment)):
-                if (left_edge is None) and (si>0):
-                    if ((segment[si][0]>=(ax.get_extent()[0]+buffer)) and
-                        (segment[si-1][0]<(ax.get_extent()[0]+buffer))):
-                        weight=((segment[si][0]-(ax.get_extent()[0]+buffer))/
-                                            (segment[si][0]-segment[si-1][0]))
-                        left_edge=(ax.get_extent()[0]+buffer,
-                                   segment[si][1]+
-                                  (segment[si][1]-segment[si-1][1])*weight)
-                if (left_edge is None) and (si<(len(segment)-1)):
-                    if ((segment[si][0]>=(ax.get_extent()[0]+buffer)) and
-                        (segment[si+1][0]<(ax.get_extent()[0]+buffer))):
-                        weight=((segment[si][0]-(ax.get_extent()[0]+buffer))/
-                                            (segment[si][0]-segment[si+1][0]))
-                        left_edge=(ax.get_extent()[0]+buffer,
-                                   segment[si][1]+
-                                  (segment[si][1]-segment[si+1][1])*weight)
-                if (right_edge is None) and (si>0):
-                    if ((segment[si][0]>=(ax.get_extent()[1]-buffer)) and
-                        (segment[si-1][0]<(ax.get_extent()[1]-buffer))):
-                        weight=((segment[si][0]-(ax.get_extent()[1]-buffer))/
-                                            (segment[si][0]-segment[si-1][0]))
-                        right_edge=(ax.get_extent()[1]-buffer,
-                                   segment[si][1]+
-                                  (segment[si][1]-segment[si-1][1])*weight)
-                if (right_edge is None) and (si<(len(segment)-1)):
-                    if ((segment[si][0]>=(ax.get_extent()[1]-buffer)) and
-                        (segment[si+1][0]<(ax.get_extent()[1]-buffer))):
-                        weight=((segment[si][0]-(ax.get_extent()[1]-buffer))/
-                                            (segment[si][0]-segment[si+1][0]))
-                        right_edge=(ax.get_extent()[1]-buffer,
-                                   segment[si][1]+
-                                  (segment[si][1]-segment[si+1][1])*weight)
-                if (bottom_edge is None) and (si>0):
-                    if ((segment[si][1]>=(ax.get_extent()[2]+buffer)) and
-                        (segment[si-1][1]<(ax.get_extent()[2]+buffer))):
-                        weight=((segment[si][1]-(ax.get_extent()[2]+buffer))/
-                                            (segment[si][1]-segment[si-1][1]))
-                        bottom_edge=(segment[si][0]+
-                                     (segment[si][0]-segment[si-1][0])*weight,
-                                     ax.get_extent()[2]+buffer)
-                if (bottom_edge is None) and (si<(len(segment)-1)):
-                    if ((segment[si][1]>=(ax.get_extent()[2]+buffer)) and
-                        (segment[si+1][1]<(ax.get_extent()[2]+buffer))):
-                        weight=((segment[si][1]-(ax.get_extent()[2]+buffer))/
-                                            (segment[si][1]-segment[si+1][1]))
-                        bottom_edge=(segment[si][0]+
-                                     (segment[si][0]-segment[si+1][0])*weight,
-                                     ax.get_extent()[2]+buffer)
-                if (top_edge is None) and (si>0):
-                    if ((segment[si][1]>=(ax.get_extent()[3]-buffer)) and
-                        (segment[si-1][1]<(ax.get_extent()[3]-buffer))):
-                        weight=((segment[si][1]-(ax.get_extent()[3]-buffer))/
-                                            (segment[si][1]-segment[si-1][1]))
-                        top_edge=(segment[si][0]+
-                                     (segment[si][0]-segment[si-1][0])*weight,
-                                     ax.get_extent()[3]-buffer)
-                if (top_edge is None) and (si<(len(segment)-1)):
-                    if ((segment[si][1]>=(ax.get_extent()[3]-buffer)) and
-                        (segment[si+1][1]<(ax.get_extent()[3]-buffer))):
-                        weight=((segment[si][1]-(ax.get_extent()[3]-buffer))/
-                                            (segment[si][1]-segment[si+1][1]))
-                        top_edge=(segment[si][0]+
-                                     (segment[si][0]-segment[si+1][0])*weight,
-                                     ax.get_extent()[3]-buffer)
-                if bottom_point is None or segment[si][1]<bottom_point[1]:
-                        bottom_point=(segment[si][0],segment[si][1])
-            if left_edge is not None:
-                label_locations.append(left_edge)
-            if right_edge is not None:
-                label_locations.append(right_edge)
-            if left_edge is None and right_edge is None:
-                if bottom_edge is not None:
-                    label_locations.append(bottom_edge)
-                if top_edge is not None:
-                    label_locations.append(top_edge)
-                if bottom_edge is None and top_edge is None:
-                    label_locations.append(bottom_point)
-
-    return label_locations
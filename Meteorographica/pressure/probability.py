@@ -0,0 +1,65 @@
+# (C) British Crown Copyright 2017, Met Office
+#
+# This code is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This code is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+
+import numpy
+import scipy.special
+
+# Estimate, at each point, the probability that a contour goes through it.
+def contour_probability(mean,spread,levels,
+                        dtype=numpy.float32,
+                        chunk_size=1000000):
+    """Probability that a contour line passes through each grid point.
+
+    For each level, the probability is the normal tail beyond the distance from the ensemble mean to that level (in units of the ensemble spread), and we want the maximum over all the levels. The tail probability falls with distance, so the maximum always comes from the level nearest the mean - find that level directly (with a binary search in the sorted levels) and evaluate the normal tail once, instead of once per level.
+
+    Args:
+        mean (:obj:`numpy.ndarray`): Ensemble mean at each grid point.
+        spread (:obj:`numpy.ndarray`): Ensemble standard deviation at each grid point - same shape as mean.
+        levels (iterable of :obj:`float`): Contour levels.
+
+    Keyword Args:
+        dtype (:obj:`numpy.dtype`): Data type used for the calculation and the result. Defaults to numpy.float32.
+        chunk_size (:obj:`int`): Number of grid points processed at once - bounds the memory used for temporary arrays. Defaults to 1,000,000.
+
+    Returns:
+        :obj:`numpy.ndarray`: Probability at each grid point (same shape as mean). Masked points in mean or spread come out as NaN.
+
+    |
+    """
+
+    levels=numpy.sort(numpy.asarray(levels,dtype=dtype).ravel())
+    mean=numpy.ma.filled(numpy.ma.asarray(mean,dtype=dtype),numpy.nan)
+    spread=numpy.ma.filled(numpy.ma.asarray(spread,dtype=dtype),numpy.nan)
+    if mean.shape!=spread.shape:
+        raise Exception("Mean and spread have different shapes %s %s" %
+                             (mean.shape,spread.shape))
+
+    result=numpy.empty(mean.shape,dtype=dtype)
+    m_flat=mean.reshape(-1)
+    s_flat=spread.reshape(-1)
+    r_flat=result.reshape(-1)
+    with numpy.errstate(divide='ignore',invalid='ignore'):
+        for start in range(0,m_flat.size,chunk_size):
+            m=m_flat[start:start+chunk_size]
+            # Levels either side of the mean
+            idx=numpy.searchsorted(levels,m)
+            above=levels[numpy.minimum(idx,len(levels)-1)]
+            below=levels[numpy.maximum(idx-1,0)]
+            distance=numpy.minimum(numpy.absolute(m-above),
+                                   numpy.absolute(m-below))
+            distance/=s_flat[start:start+chunk_size]
+            # 1-cdf(x) == cdf(-x), and ndtr keeps float32 as float32
+            numpy.negative(distance,out=distance)
+            scipy.special.ndtr(distance,out=r_flat[start:start+chunk_size])
+
+    return result
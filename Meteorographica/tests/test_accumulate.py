@@ -0,0 +1,73 @@
+# (C) British Crown Copyright 2017, Met Office
+#
+# This code is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This code is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+
+import unittest
+import numpy
+import iris
+import iris.coords
+import iris.coord_systems
+import matplotlib
+matplotlib.use('agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import cartopy.crs as ccrs
+
+import Meteorographica.precipitation as precipitation
+
+def _axes():
+    fig=Figure(figsize=(4,2),dpi=100)
+    FigureCanvasAgg(fig)
+    proj=ccrs.RotatedPole(pole_longitude=180.0,pole_latitude=90.0)
+    ax=fig.add_axes([0,0,1,1],projection=proj)
+    ax.set_extent([-20,20,-10,10],crs=proj)
+    return ax
+
+# Rate fields, every 3 hours - each time point is the end of its step
+def _rates(n_steps,bounds=False):
+    cs=iris.coord_systems.GeogCS(6371229.0)
+    for i in range(n_steps):
+        cube=iris.cube.Cube(numpy.full((30,60),i+1.0,dtype=numpy.float32))
+        cube.add_dim_coord(iris.coords.DimCoord(numpy.linspace(-30,30,30),
+                           standard_name='latitude',units='degrees',
+                           coord_system=cs),0)
+        cube.add_dim_coord(iris.coords.DimCoord(numpy.linspace(-60,60,60),
+                           standard_name='longitude',units='degrees',
+                           coord_system=cs),1)
+        point=3.0*(i+1)
+        cube.add_aux_coord(iris.coords.DimCoord(point,
+                           bounds=[point-3,point] if bounds else None,
+                           standard_name='time',
+                           units='hours since 1987-10-16 00:00:00'))
+        yield cube
+
+class TestAccumulate(unittest.TestCase):
+
+    def test_total(self):
+        total=precipitation.accumulate(_axes(),_rates(4),step=3*3600)
+        numpy.testing.assert_allclose(total.data,(1+2+3+4)*3*3600.0)
+        self.assertEqual(total.dtype,numpy.dtype(numpy.float32))
+
+    # The period starts a step before the first time point
+    def test_period(self):
+        for n_steps in (1,4):
+            for bounds in (False,True):
+                with self.subTest(n_steps=n_steps,bounds=bounds):
+                    total=precipitation.accumulate(_axes(),
+                                           _rates(n_steps,bounds),
+                                           step=3*3600)
+                    numpy.testing.assert_allclose(
+                                  total.coord('time').bounds,
+                                  [[0,3.0*n_steps]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+# (C) British Crown Copyright 2017, Met Office
+#
+# This code is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This code is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+
+import unittest
+import numpy
+
+import Meteorographica.utils as utils
+
+# Ensemble of smooth fields, (member,latitude,longitude)
+def _ensemble(n_members=5,masked=False):
+    lats=numpy.linspace(-30,30,31)
+    lons=numpy.linspace(-60,60,61)
+    x,y=numpy.meshgrid(numpy.radians(lons),numpy.radians(lats))
+    data=numpy.stack([1000+20*numpy.sin(3*x+m)*numpy.cos(2*y)
+                      for m in range(n_members)]).astype(numpy.float32)
+    if masked:
+        data=numpy.ma.masked_array(data,numpy.zeros(data.shape,dtype=bool))
+        data[:,10:14,20:25]=numpy.ma.masked
+    return lons,lats,data
+
+class TestTraceEnsembleContours(unittest.TestCase):
+
+    # The shared-memory process pool gives the same lines, in the
+    #  same order, as contouring in this process
+    def test_workers(self):
+        levels=[990,1000,1010]
+        for masked in (False,True):
+            with self.subTest(masked=masked):
+                lons,lats,data=_ensemble(masked=masked)
+                serial=utils.trace_ensemble_contours(lons,lats,data,levels)
+                pool=utils.trace_ensemble_contours(lons,lats,data,levels,
+                                                   workers=2)
+                self.assertEqual(len(pool),len(levels))
+                self.assertGreater(sum(len(s) for s in serial),0)
+                for s_level,p_level in zip(serial,pool):
+                    self.assertEqual(len(s_level),len(p_level))
+                    for s_line,p_line in zip(s_level,p_level):
+                        numpy.testing.assert_array_equal(s_line,p_line)
+
+if __name__ == '__main__':
+    unittest.main()
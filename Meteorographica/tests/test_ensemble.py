@@ -0,0 +1,81 @@
+# (C) British Crown Copyright 2017, Met Office
+#
+# This code is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This code is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+
+import unittest
+import numpy
+import dask.array
+import iris
+import iris.coords
+import iris.analysis
+
+import Meteorographica.utils as utils
+
+# Ensemble of random pressure fields, optionally with masked points
+#  (some masked in every member) and lazy data
+def _ensemble(masked=False,lazy=False):
+    rs=numpy.random.RandomState(0)
+    values=101325+1000*rs.standard_normal((20,15,24)).astype(numpy.float32)
+    if masked:
+        mask=rs.uniform(size=values.shape)<0.2
+        mask[:,3,5]=True
+        values=numpy.ma.masked_array(values,mask)
+    if lazy:
+        values=dask.array.from_array(values,chunks=(5,15,24),
+                                     asarray=not masked)
+    cube=iris.cube.Cube(values)
+    cube.add_dim_coord(iris.coords.DimCoord(numpy.arange(20),
+                                            long_name='member'),0)
+    cube.add_dim_coord(iris.coords.DimCoord(numpy.linspace(-70,70,15),
+                       standard_name='latitude',units='degrees'),1)
+    cube.add_dim_coord(iris.coords.DimCoord(numpy.arange(0,360,15.0),
+                       standard_name='longitude',units='degrees'),2)
+    return cube
+
+class TestEnsembleMeanSpread(unittest.TestCase):
+
+    def _check(self,cube):
+        mean,spread=utils.ensemble_mean_spread(cube,chunk_size=3)
+        reference=cube.copy(data=cube.core_data())
+        i_mean=reference.collapsed('member',iris.analysis.MEAN)
+        i_spread=reference.collapsed('member',iris.analysis.STD_DEV)
+        numpy.testing.assert_array_equal(numpy.ma.getmaskarray(mean.data),
+                                numpy.ma.getmaskarray(i_mean.data))
+        numpy.testing.assert_allclose(numpy.ma.filled(mean.data,0),
+                                      numpy.ma.filled(i_mean.data,0),
+                                      rtol=0,atol=0.05)
+        numpy.testing.assert_allclose(numpy.ma.filled(spread.data,0),
+                                      numpy.ma.filled(i_spread.data,0),
+                                      rtol=0,atol=0.05)
+        return mean,spread
+
+    def test_unmasked(self):
+        self._check(_ensemble())
+
+    def test_lazy(self):
+        cube=_ensemble(lazy=True)
+        self._check(cube)
+        self.assertTrue(cube.has_lazy_data())
+
+    def test_masked(self):
+        mean,spread=self._check(_ensemble(masked=True))
+        self.assertTrue(mean.data.mask[3,5])
+
+    def test_masked_lazy(self):
+        cube=_ensemble(masked=True,lazy=True)
+        mean,spread=self._check(cube)
+        self.assertTrue(mean.data.mask[3,5])
+        self.assertTrue(spread.data.mask[3,5])
+        self.assertTrue(cube.has_lazy_data())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+# (C) British Crown Copyright 2017, Met Office
+#
+# This code is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This code is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+
+import os
+import tempfile
+import unittest
+import unittest.mock
+import importlib
+import numpy
+import cartopy.crs as ccrs
+
+import Meteorographica.utils as utils
+geometry_cache=importlib.import_module('Meteorographica.utils.geometry_cache')
+
+def _field(phase=0.0):
+    lats=numpy.linspace(-30,30,31)
+    lons=numpy.linspace(-60,60,61)
+    x,y=numpy.meshgrid(numpy.radians(lons),numpy.radians(lats))
+    data=1000+20*numpy.sin(3*x+phase)*numpy.cos(2*y)
+    return lons,lats,data.astype(numpy.float32)
+
+_levels=[990,1000,1010]
+
+class TestContourCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp=tempfile.TemporaryDirectory()
+        self.cache=utils.ContourCache(os.path.join(self.tmp.name,'lines'))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _files(self):
+        return sorted(n for n in os.listdir(self.cache.directory)
+                      if n.endswith('.npz'))
+
+    # A miss calculates and writes the lines, a hit loads the same lines
+    #  without calculating them
+    def test_miss_then_hit(self):
+        lons,lats,data=_field()
+        first=utils.cached_contours(self.cache,lons,lats,data,_levels)
+        key=self.cache.key(lons,lats,data,_levels)
+        self.assertEqual(self._files(),["%s.npz" % key])
+        with unittest.mock.patch.object(geometry_cache,'trace_contours') as trace:
+            second=utils.cached_contours(self.cache,lons,lats,data,_levels)
+        trace.assert_not_called()
+        self.assertEqual(len(first),len(second))
+        for f_level,s_level in zip(first,second):
+            self.assertEqual(len(f_level),len(s_level))
+            for f_line,s_line in zip(f_level,s_level):
+                numpy.testing.assert_array_equal(f_line,s_line)
+        self.assertGreater(sum(len(l) for l in first),0)
+
+    def test_key(self):
+        lons,lats,data=_field()
+        key=self.cache.key(lons,lats,data,_levels)
+        self.assertEqual(key,self.cache.key(lons.copy(),lats.copy(),
+                                            data.copy(),list(_levels)))
+        changed=[self.cache.key(lons,lats,_field(0.1)[2],_levels),
+                 self.cache.key(lons,lats,data,[995,1005]),
+                 self.cache.key(lons+1,lats,data,_levels),
+                 self.cache.key(lons,lats+1,data,_levels),
+                 self.cache.key(lons,lats,data,_levels,
+                                ccrs.RotatedPole(pole_longitude=177.5,
+                                                 pole_latitude=37.5)),
+                 self.cache.key(lons,lats,
+                                numpy.ma.masked_greater(data,1015),_levels)]
+        self.assertEqual(len(set(changed+[key])),len(changed)+1)
+        # Different projections give different keys
+        self.assertNotEqual(
+            self.cache.key(lons,lats,data,_levels,
+                           ccrs.RotatedPole(pole_longitude=177.5,
+                                            pole_latitude=37.5)),
+            self.cache.key(lons,lats,data,_levels,
+                           ccrs.RotatedPole(pole_longitude=60,
+                                            pole_latitude=20)))
+
+    # Over max_size, the least-recently-used files go first
+    def test_eviction(self):
+        lons,lats,data=_field()
+        keys=[]
+        for i in range(4):
+            phase_data=_field(0.5*i)[2]
+            utils.cached_contours(self.cache,lons,lats,phase_data,_levels)
+            keys.append(self.cache.key(lons,lats,phase_data,_levels))
+            # Distinct, increasing, use times
+            filename=os.path.join(self.cache.directory,"%s.npz" % keys[-1])
+            os.utime(filename,(1.0e9+i,1.0e9+i))
+        sizes=[os.path.getsize(os.path.join(self.cache.directory,
+                                            "%s.npz" % k)) for k in keys]
+        # Room for the newest two only
+        self.cache.max_size=sizes[2]+sizes[3]
+        self.cache.evict()
+        self.assertEqual(self._files(),sorted("%s.npz" % k for k in keys[2:]))
+
+if __name__ == '__main__':
+    unittest.main()
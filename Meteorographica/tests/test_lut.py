@@ -0,0 +1,69 @@
+# (C) British Crown Copyright 2017, Met Office
+#
+# This code is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This code is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+
+import unittest
+import importlib
+import numpy
+import matplotlib
+matplotlib.use('agg')
+import matplotlib.colors
+
+lut_module=importlib.import_module('Meteorographica.precipitation.lut')
+
+def _cmap(colours,bad='white'):
+    cmap=matplotlib.colors.ListedColormap(colours,name='test')
+    cmap.set_bad(bad)
+    return cmap
+
+def _expected(cmap,alpha,n_colours):
+    lut=numpy.empty((n_colours+1,4),dtype=numpy.uint8)
+    lut[:-1]=cmap((numpy.arange(n_colours)+0.5)/n_colours,bytes=True)
+    lut[-1]=cmap(numpy.nan,bytes=True)
+    lut[:,3]=lut[:,3]*alpha
+    return lut
+
+class TestRgbaLut(unittest.TestCase):
+
+    def setUp(self):
+        lut_module._luts.clear()
+
+    def test_colours(self):
+        cmap=_cmap(['red','blue'])
+        numpy.testing.assert_array_equal(lut_module.rgba_lut(cmap,0.5,16),
+                                         _expected(cmap,0.5,16))
+
+    def test_cache_hit(self):
+        first=lut_module.rgba_lut(_cmap(['red','blue']),0.5,16)
+        self.assertIs(lut_module.rgba_lut(_cmap(['red','blue']),0.5,16),
+                      first)
+        self.assertEqual(len(lut_module._luts),1)
+
+    # Same object and name, new colours - must not get the old table
+    def test_changed_in_place(self):
+        cmap=_cmap(['red','blue'])
+        lut_module.rgba_lut(cmap,1.0,16)
+        cmap.set_bad('black')
+        numpy.testing.assert_array_equal(lut_module.rgba_lut(cmap,1.0,16),
+                                         _expected(cmap,1.0,16))
+
+    # A new colour map, with the same name, that may reuse a dead one's id
+    def test_same_name(self):
+        for colours in (['red','blue'],['green','yellow'],['black','white']):
+            cmap=_cmap(colours)
+            numpy.testing.assert_array_equal(
+                           lut_module.rgba_lut(cmap,1.0,16),
+                           _expected(cmap,1.0,16))
+            del cmap
+
+if __name__ == '__main__':
+    unittest.main()
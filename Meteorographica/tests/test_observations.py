@@ -0,0 +1,57 @@
+# (C) British Crown Copyright 2017, Met Office
+#
+# This code is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This code is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+
+import unittest
+import numpy
+import pandas
+import matplotlib
+matplotlib.use('agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import cartopy.crs as ccrs
+
+import Meteorographica.observations as observations
+
+def _axes():
+    fig=Figure(figsize=(4,2),dpi=100)
+    FigureCanvasAgg(fig)
+    proj=ccrs.RotatedPole(pole_longitude=180.0,pole_latitude=90.0)
+    ax=fig.add_axes([0,0,1,1],projection=proj)
+    ax.set_extent([-20,20,-10,10],crs=proj)
+    return ax
+
+def _obs(n=50):
+    rs=numpy.random.RandomState(0)
+    return pandas.DataFrame({'Latitude':rs.uniform(-10,10,n),
+                             'Longitude':rs.uniform(-20,20,n),
+                             'weight':rs.uniform(0,1,n)})
+
+class TestPlotPatches(unittest.TestCase):
+
+    def test_weighted_alpha(self):
+        obs=_obs()
+        circles=observations.plot_patches(_axes(),obs,alpha=0.5)
+        numpy.testing.assert_allclose(circles.get_facecolor()[:,3],
+                                      0.5*obs['weight'].values)
+        numpy.testing.assert_allclose(circles.get_edgecolor()[:,3],
+                                      0.5*obs['weight'].values)
+
+    # A colour of 'none' stays invisible
+    def test_no_colour(self):
+        circles=observations.plot_patches(_axes(),_obs(),
+                                          facecolor='none',edgecolor='red')
+        self.assertTrue(numpy.all(circles.get_facecolor()[:,3]==0))
+        self.assertTrue(numpy.all(circles.get_edgecolor()[:,3]>0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+# (C) British Crown Copyright 2017, Met Office
+#
+# This code is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This code is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+
+import unittest
+import unittest.mock
+import importlib
+import numpy
+import iris
+import iris.coords
+import iris.coord_systems
+import matplotlib
+matplotlib.use('agg')
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import cartopy.crs as ccrs
+
+import Meteorographica.utils as utils
+import Meteorographica.pressure as pressure
+import Meteorographica.precipitation as precipitation
+# The plot modules (the packages' 'plot' is the plot function)
+pressure_plot=importlib.import_module('Meteorographica.pressure.plot')
+precipitation_plot=importlib.import_module(
+                          'Meteorographica.precipitation.plot')
+
+# Fine-grid field (much finer than the plot grid - so it gets
+#  block-averaged before regridding), in a given data type
+def _field(dtype,offset=1000):
+    cs=iris.coord_systems.GeogCS(6371229.0)
+    lats=numpy.arange(-60,60,0.25)
+    lons=numpy.arange(-90,90,0.25)
+    x,y=numpy.meshgrid(numpy.radians(lons),numpy.radians(lats))
+    values=offset+20*numpy.sin(3*x)*numpy.cos(2*y)
+    cube=iris.cube.Cube(values.astype(dtype))
+    cube.add_dim_coord(iris.coords.DimCoord(lats,standard_name='latitude',
+                       units='degrees',coord_system=cs),0)
+    cube.add_dim_coord(iris.coords.DimCoord(lons,standard_name='longitude',
+                       units='degrees',coord_system=cs),1)
+    return cube
+
+def _axes():
+    fig=Figure(figsize=(4,3),dpi=100)
+    FigureCanvasAgg(fig)
+    proj=ccrs.RotatedPole(pole_longitude=180.0,pole_latitude=90.0)
+    ax=fig.add_axes([0,0,1,1],projection=proj)
+    ax.set_extent([-40,40,-30,30],crs=proj)
+    return ax
+
+_sources=(numpy.float32,numpy.float64,numpy.int32)
+
+class TestFloatDtype(unittest.TestCase):
+
+    def test_default(self):
+        self.assertEqual(utils.get_float_dtype(),numpy.dtype(numpy.float32))
+
+    def test_dummy_cube(self):
+        self.assertEqual(utils.dummy_cube(_axes(),2.0).dtype,
+                         numpy.dtype(numpy.float32))
+
+    def test_regrid(self):
+        for dtype in _sources:
+            with self.subTest(dtype=dtype):
+                target=utils.dummy_cube(_axes(),2.0)
+                source=_field(dtype)
+                self.assertEqual(utils.block_mean(source,target).dtype,
+                                 numpy.dtype(numpy.float32))
+                result=utils.regrid(source,target)
+                self.assertEqual(result.dtype,numpy.dtype(numpy.float32))
+                self.assertTrue(numpy.isfinite(result.data).all())
+
+    def test_scaled_data(self):
+        for dtype in _sources:
+            with self.subTest(dtype=dtype):
+                cube=_field(dtype)
+                original=cube.data.copy()
+                data=utils.scaled_data(cube,0.01)
+                self.assertEqual(data.dtype,numpy.dtype(numpy.float32))
+                # The cube is unchanged
+                numpy.testing.assert_array_equal(cube.data,original)
+
+    # The array handed to matplotlib's contouring is float32
+    def test_contour(self):
+        for dtype in _sources:
+            with self.subTest(dtype=dtype):
+                with unittest.mock.patch('Meteorographica.pressure.plot._contour',
+                                 wraps=pressure_plot._contour) as contour:
+                    pressure.plot_contour(_axes(),_field(dtype),
+                                          resolution=2.0,scale=1.0,
+                                          levels=[995,1000,1005])
+                data=contour.call_args[0][3]
+                self.assertEqual(data.dtype,numpy.dtype(numpy.float32))
+
+    def test_cmesh(self):
+        for dtype in _sources:
+            for lut in (True,False):
+                with self.subTest(dtype=dtype,lut=lut):
+                    with unittest.mock.patch(
+                              'Meteorographica.precipitation.plot.lut_image',
+                              wraps=precipitation_plot.lut_image) as image:
+                        img=precipitation.plot_cmesh(_axes(),
+                                          _field(dtype,offset=30),
+                                          resolution=2.0,scale=0.001,lut=lut)
+                    if lut:
+                        data=image.call_args[0][3]
+                    else:
+                        data=img.get_array()
+                    self.assertEqual(data.dtype,numpy.dtype(numpy.float32))
+
+    def test_set_float_dtype(self):
+        previous=utils.set_float_dtype(numpy.float64)
+        try:
+            result=utils.regrid(_field(numpy.float32),
+                                utils.dummy_cube(_axes(),2.0))
+            self.assertEqual(result.dtype,numpy.dtype(numpy.float64))
+        finally:
+            utils.set_float_dtype(previous)
+        self.assertRaises(Exception,utils.set_float_dtype,numpy.int32)
+
+if __name__ == '__main__':
+    unittest.main()
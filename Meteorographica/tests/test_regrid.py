@@ -0,0 +1,143 @@
+# (C) British Crown Copyright 2017, Met Office
+#
+# This code is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This code is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+
+import unittest
+import unittest.mock
+import importlib
+import numpy
+import iris
+import iris.coords
+import iris.coord_systems
+
+import Meteorographica.utils as utils
+# The regrid module (utils.regrid is the regrid function)
+regrid_module=importlib.import_module('Meteorographica.utils.regrid')
+
+# Global grid with the given number of latitudes and longitudes
+def _grid(n_lats,n_lons,values=None):
+    cs=iris.coord_systems.GeogCS(6371229.0)
+    lats=numpy.linspace(-90,90,n_lats)
+    lons=numpy.linspace(0,360,n_lons,endpoint=False)
+    if values is None:
+        values=numpy.zeros((n_lats,n_lons),dtype=numpy.float32)
+    cube=iris.cube.Cube(values)
+    cube.add_dim_coord(iris.coords.DimCoord(lats,standard_name='latitude',
+                       units='degrees',coord_system=cs),0)
+    cube.add_dim_coord(iris.coords.DimCoord(lons,standard_name='longitude',
+                       units='degrees',coord_system=cs,circular=True),1)
+    return cube
+
+# Smooth field on a global grid
+def _field(n_lats=73,n_lons=144):
+    lats=numpy.radians(numpy.linspace(-90,90,n_lats))
+    lons=numpy.radians(numpy.linspace(0,360,n_lons,endpoint=False))
+    x,y=numpy.meshgrid(lons,lats)
+    values=1000+20*numpy.sin(3*x)*numpy.cos(2*y)+5*numpy.cos(x-y)
+    return _grid(n_lats,n_lons,values.astype(numpy.float32))
+
+# Regional target grid, optionally on a rotated pole
+def _target(pole=None,lons=(-30,30),lats=(-20,20)):
+    if pole is None:
+        cs=iris.coord_systems.GeogCS(6371229.0)
+    else:
+        cs=iris.coord_systems.RotatedGeogCS(pole[1],pole[0])
+    cube=iris.cube.Cube(numpy.zeros((41,61),dtype=numpy.float32))
+    cube.add_dim_coord(iris.coords.DimCoord(numpy.linspace(*lats,41),
+                       standard_name='latitude',units='degrees',
+                       coord_system=cs),0)
+    cube.add_dim_coord(iris.coords.DimCoord(numpy.linspace(*lons,61),
+                       standard_name='longitude',units='degrees',
+                       coord_system=cs),1)
+    return cube
+
+class TestRegrid(unittest.TestCase):
+
+    def setUp(self):
+        regrid_module._regridders.clear()
+
+    def _compare(self,source,target):
+        result=utils.regrid(source,target,block_average=False)
+        reference=source.regrid(target,iris.analysis.Linear())
+        numpy.testing.assert_array_equal(numpy.ma.getmaskarray(result.data),
+                                numpy.ma.getmaskarray(reference.data))
+        numpy.testing.assert_allclose(numpy.ma.filled(result.data,0),
+                                      numpy.ma.filled(reference.data,0),
+                                      rtol=0,atol=1.0e-3)
+        return result
+
+    # Target spans the source's 0/360 seam
+    def test_circular(self):
+        self._compare(_field(),_target())
+
+    def test_rotated_target(self):
+        self._compare(_field(),_target(pole=(177.5,37.5)))
+
+    def test_masked(self):
+        source=_field()
+        data=numpy.ma.masked_array(source.data,
+                                   numpy.zeros(source.shape,dtype=bool))
+        data[30:34,0:3]=numpy.ma.masked
+        data[40:42,130:135]=numpy.ma.masked
+        source=source.copy(data=data)
+        result=self._compare(source,_target())
+        self.assertTrue(numpy.ma.is_masked(result.data))
+
+    # The weights are made once, and re-used for another field
+    #  on the same grids
+    def test_cache_hit(self):
+        target=_target(pole=(177.5,37.5))
+        with unittest.mock.patch.object(regrid_module,'_LinearRegridder',
+                          wraps=regrid_module._LinearRegridder) as made:
+            first=utils.regrid(_field(),target,block_average=False)
+            source=_field()
+            second=utils.regrid(source.copy(data=source.data*2),target,
+                                block_average=False)
+        self.assertEqual(made.call_count,1)
+        self.assertEqual(len(regrid_module._regridders),1)
+        numpy.testing.assert_allclose(second.data,first.data*2,rtol=1.0e-6)
+
+class TestBlockMean(unittest.TestCase):
+
+    # ERA5-style 0.25 degree grid - 721 latitudes, which no block size
+    #  near the target spacing divides
+    def test_ragged_latitude(self):
+        rs=numpy.random.RandomState(0)
+        source=_grid(721,1440,rs.standard_normal((721,1440)).astype(
+                                                            numpy.float32))
+        target=_grid(121,240)
+        result=utils.block_mean(source,target)
+        self.assertEqual(result.shape,(121,240))
+        lats=result.coord('latitude').points
+        self.assertAlmostEqual(lats[0],-89.375)
+        self.assertAlmostEqual(lats[-1],90.0)
+        # Last (short) block is just the last row
+        numpy.testing.assert_allclose(result.data[-1],
+                              source.data[-1].reshape(240,6).mean(axis=1),
+                              rtol=1.0e-5,atol=1.0e-6)
+        self.assertFalse(numpy.ma.is_masked(result.data))
+
+    # Masked source points get no weight, and the source mask is unchanged
+    def test_masked(self):
+        values=numpy.ma.masked_array(numpy.ones((181,360),dtype=numpy.float32),
+                                     mask=numpy.zeros((181,360),dtype=bool))
+        values[0:4]=numpy.ma.masked
+        values[4:8]=3.0
+        source=_grid(181,360,values)
+        result=utils.block_mean(source,_grid(46,90))
+        self.assertTrue(result.data.mask[0].all())
+        self.assertEqual(source.data.mask.sum(),4*360)
+        numpy.testing.assert_allclose(result.data[1],3.0,rtol=1.0e-6)
+        self.assertEqual(result.dtype,numpy.dtype(numpy.float32))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+# (C) British Crown Copyright 2017, Met Office
+#
+# This code is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This code is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+
+import unittest
+import numpy
+import iris
+import iris.coords
+import iris.coord_systems
+import iris.analysis.cartography
+import cartopy.crs as ccrs
+
+import Meteorographica.wind as wind
+
+# Smooth u and v fields on a regular lat:lon grid
+def _winds():
+    cs=iris.coord_systems.GeogCS(6371229.0)
+    lats=numpy.linspace(-60,60,49)
+    lons=numpy.linspace(-180,177.5,144)
+    x,y=numpy.meshgrid(numpy.radians(lons),numpy.radians(lats))
+    cubes=[]
+    for name,values in (('x_wind',10*numpy.cos(y)+5*numpy.sin(2*x)),
+                        ('y_wind',8*numpy.sin(x+y)-3)):
+        cube=iris.cube.Cube(values.astype(numpy.float32),standard_name=name,
+                            units='m s-1')
+        cube.add_dim_coord(iris.coords.DimCoord(lats,
+                           standard_name='latitude',units='degrees',
+                           coord_system=cs),0)
+        cube.add_dim_coord(iris.coords.DimCoord(lons,
+                           standard_name='longitude',units='degrees',
+                           coord_system=cs),1)
+        cubes.append(cube)
+    return cubes
+
+class TestRotateWinds(unittest.TestCase):
+
+    # Same rotated components as iris, for real rotated poles
+    def test_matches_iris(self):
+        u,v=_winds()
+        for pole_longitude,pole_latitude in ((177.5,37.5),(60,20),(180,90)):
+            target=ccrs.RotatedPole(pole_longitude=pole_longitude,
+                                    pole_latitude=pole_latitude)
+            cs=iris.coord_systems.RotatedGeogCS(pole_latitude,
+                                                pole_longitude)
+            ui,vi=iris.analysis.cartography.rotate_winds(u,v,cs)
+            um,vm=wind.rotate_winds(u,v,target)
+            # Directions are undefined at the rotated poles, and iris
+            #  can't find them at the grid's seam
+            x,y=numpy.meshgrid(u.coord('longitude').points,
+                               u.coord('latitude').points)
+            rotated=target.transform_points(ccrs.PlateCarree(),x,y)
+            ok=(numpy.isfinite(numpy.ma.filled(ui.data,numpy.nan)) &
+                numpy.isfinite(numpy.ma.filled(vi.data,numpy.nan)) &
+                (numpy.absolute(rotated[...,1])<89))
+            self.assertGreater(ok.mean(),0.95)
+            numpy.testing.assert_allclose(um.data[ok],ui.data[ok],atol=0.01)
+            numpy.testing.assert_allclose(vm.data[ok],vi.data[ok],atol=0.01)
+
+    # Rotation doesn't change the wind speed
+    def test_preserves_speed(self):
+        u,v=_winds()
+        target=ccrs.RotatedPole(pole_longitude=60,pole_latitude=20)
+        um,vm=wind.rotate_winds(u,v,target)
+        numpy.testing.assert_allclose(numpy.hypot(um.data,vm.data),
+                                      numpy.hypot(u.data,v.data),
+                                      rtol=1.0e-5,atol=1.0e-4)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,80 @@
+# (C) British Crown Copyright 2017, Met Office
+#
+# This code is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This code is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+
+import unittest
+import numpy
+import iris
+import iris.coords
+import iris.coord_systems
+import matplotlib
+matplotlib.use('agg')
+import matplotlib.contour
+import matplotlib.collections
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import cartopy.crs as ccrs
+
+import Meteorographica.pressure as pressure
+
+def _axes():
+    fig=Figure(figsize=(4,2),dpi=100)
+    FigureCanvasAgg(fig)
+    proj=ccrs.RotatedPole(pole_longitude=180.0,pole_latitude=90.0)
+    ax=fig.add_axes([0,0,1,1],projection=proj)
+    ax.set_extent([-40,40,-20,20],crs=proj)
+    return ax
+
+# Small pressure ensemble (hPa)
+def _ensemble(n_members=3):
+    cs=iris.coord_systems.GeogCS(6371229.0)
+    lats=numpy.linspace(-30,30,31)
+    lons=numpy.linspace(-60,60,61)
+    x,y=numpy.meshgrid(numpy.radians(lons),numpy.radians(lats))
+    values=numpy.stack([1000+20*numpy.sin(3*x+m)*numpy.cos(2*y)
+                        for m in range(n_members)]).astype(numpy.float32)
+    cube=iris.cube.Cube(values)
+    cube.add_dim_coord(iris.coords.DimCoord(numpy.arange(n_members),
+                                            long_name='member'),0)
+    cube.add_dim_coord(iris.coords.DimCoord(lats,standard_name='latitude',
+                       units='degrees',coord_system=cs),1)
+    cube.add_dim_coord(iris.coords.DimCoord(lons,standard_name='longitude',
+                       units='degrees',coord_system=cs),2)
+    return cube
+
+class TestSpaghetti(unittest.TestCase):
+
+    # By default, a ContourSet for each member - as before batching
+    def test_default(self):
+        CS=pressure.plot_spaghetti_contour(_axes(),_ensemble(),
+                                           levels=[990,1000,1010])
+        self.assertEqual(len(CS),3)
+        for member in CS:
+            self.assertIsInstance(member,matplotlib.contour.ContourSet)
+            numpy.testing.assert_array_equal(member.levels,[990,1000,1010])
+
+    def test_batched(self):
+        lines=pressure.plot_spaghetti_contour(_axes(),_ensemble(),
+                                              levels=[990,1000,1010],
+                                              batched=True)
+        self.assertEqual(len(lines),3)
+        for level in lines:
+            self.assertIsInstance(level,matplotlib.collections.LineCollection)
+
+    # A pool only works with batched contouring - asking for one
+    #  without it is an error, not a silent serial run
+    def test_workers_needs_batched(self):
+        self.assertRaises(Exception,pressure.plot_spaghetti_contour,
+                          _axes(),_ensemble(),levels=[1000],workers=2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,181 @@
+# (C) British Crown Copyright 2017, Met Office
+#
+# This code is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This code is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+
+# Export a plot layer as a pyramid of map tiles (z/x/y.png), for
+#  a web map viewer.
+#
+# The tiles are on a lat:lon (plate carree) grid - the 'WorldCRS84Quad'
+#  layout: zoom level z has 2**(z+1) columns and 2**z rows of square
+#  tiles, each 180/2**z degrees across, with x counting east from 180W
+#  and y counting south from 90N. The plot functions need a rotated-pole
+#  axes, and a rotated pole with the pole at the north pole is a lat:lon
+#  grid, so the tiles can be drawn by the standard plot functions.
+
+import os
+import math
+import concurrent.futures
+import numpy
+import iris
+import matplotlib
+import matplotlib.image
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import cartopy.crs as ccrs
+
+import Meteorographica.utils as utils
+
+# Projection of the tiles - lat:lon
+def _tile_projection():
+    return ccrs.RotatedPole(pole_longitude=180.0,pole_latitude=90.0)
+
+# Extent (lon_min,lon_max,lat_min,lat_max) of a tile
+def tile_extent(z,x,y):
+    """Region covered by a map tile.
+
+    Args:
+        z (:obj:`int`): Zoom level - there are 2**(z+1) tiles east-west, and 2**z north-south.
+        x (:obj:`int`): Column of the tile, counting east from 180W.
+        y (:obj:`int`): Row of the tile, counting south from 90N.
+
+    Returns:
+        :obj:`tuple` - (minimum longitude, maximum longitude, minimum latitude, maximum latitude) of the tile, in degrees.
+
+    |
+    """
+
+    size=180.0/2**z
+    return (-180.0+x*size,-180.0+(x+1)*size,
+            90.0-(y+1)*size,90.0-y*size)
+
+# The tiles at a zoom level that overlap a region
+def tiles_covering(z,extent=(-180,180,-90,90)):
+    """List the map tiles, at one zoom level, that cover a region.
+
+    Args:
+        z (:obj:`int`): Zoom level.
+        extent (:obj:`tuple`, optional): Region to cover - (minimum longitude, maximum longitude, minimum latitude, maximum latitude) in degrees. Defaults to the whole globe.
+
+    Returns:
+        :obj:`list` of :obj:`tuple` - (z,x,y) for each tile.
+
+    |
+    """
+
+    size=180.0/2**z
+    x0=max(0,int(math.floor((extent[0]+180)/size)))
+    x1=min(2**(z+1),int(math.ceil((extent[1]+180)/size)))
+    y0=max(0,int(math.floor((90-extent[3])/size)))
+    y1=min(2**z,int(math.ceil((90-extent[2])/size)))
+    return [(z,x,y) for y in range(y0,y1) for x in range(x0,x1)]
+
+# Figure and axes to draw one tile into - or a region, to make a plot grid
+def _tile_axes(extent,width,height):
+    fig=Figure(figsize=(width/100.0,height/100.0),dpi=100,frameon=False)
+    FigureCanvasAgg(fig)
+    ax=fig.add_axes([0,0,1,1],projection=_tile_projection())
+    ax.set_axis_off()
+    ax.patch.set_visible(False)
+    ax.set_extent(extent,crs=_tile_projection())
+    return fig,ax
+
+# Subset of a lat:lon cube covering a region (plus a margin of grid cells)
+def _subset(cube,extent,margin=2):
+    index=[slice(None)]*cube.ndim
+    for name,(low,high) in (('longitude',extent[0:2]),
+                            ('latitude',extent[2:4])):
+        points=cube.coord(name).points
+        start=max(0,numpy.searchsorted(points,low)-margin)
+        end=min(len(points),numpy.searchsorted(points,high)+margin)
+        index[cube.coord_dims(name)[0]]=slice(start,end)
+    return cube[tuple(index)]
+
+# Draw one tile, and write it if there's anything on it
+def _render_tile(task):
+    layer,cube,(z,x,y),tile_size,directory,kwargs=task
+    data=utils.cube_data(cube)
+    if numpy.ma.count(numpy.ma.masked_invalid(data))==0:
+        return None
+    fig,ax=_tile_axes(tile_extent(z,x,y),tile_size,tile_size)
+    layer(ax,cube,**dict(kwargs,resolution=None))
+    fig.canvas.draw()
+    rgba=numpy.asarray(fig.canvas.buffer_rgba())
+    if not rgba[...,3].any():
+        return None
+    path=os.path.join(directory,str(z),str(x),"%d.png" % y)
+    os.makedirs(os.path.dirname(path),exist_ok=True)
+    matplotlib.image.imsave(path,rgba)
+    return path
+
+# Write a tile pyramid for a plot layer
+def export_tiles(directory,layer,pe,**kwargs):
+    """Draw a plot layer as a pyramid of map tiles, for a web map viewer.
+
+    Writes a PNG, with a transparent background, for each tile: <directory>/<z>/<x>/<y>.png. The tiles are on a lat:lon grid - zoom level z has 2**(z+1) columns and 2**z rows of tiles, each 180/2**z degrees across (see :func:`tile_extent`) - so the viewer must be set up for that layout (EPSG:4326, 'WorldCRS84Quad'), not the usual web-mercator one.
+
+    At each zoom level the data are regridded once (see :func:`Meteorographica.utils.regrid`), onto a grid at the resolution of the tile pixels covering the whole region to be exported, and each tile is drawn from its own part of that grid - so the grid is only made once, however many tiles there are. The grid for a zoom level covers the whole region, so for deep zoom levels restrict the region (with extent). Tiles are drawn in a pool of worker processes (if workers is set). Tiles with no data, or nothing drawn on them (all transparent - no precipitation, or no contours) are not written.
+
+    Args:
+        directory (:obj:`str`): Directory to write the tiles into - made if it doesn't exist.
+        layer (:obj:`function`): Plot function - called as layer(ax,cube,\*\*kwargs) for each tile. Usually :func:`Meteorographica.precipitation.plot_cmesh` or :func:`Meteorographica.pressure.plot_contour`. With workers, this must be a module-level function (so it can be sent to the worker processes).
+        pe (:obj:`iris.cube.Cube`): Variable to plot - must be 2d, with dimensions latitude and longitude.
+
+    Keyword Args:
+        zooms (iterable of :obj:`int`): Zoom levels to write. Defaults to 0, 1 and 2.
+        extent (:obj:`tuple`): Region to write tiles for - (minimum longitude, maximum longitude, minimum latitude, maximum latitude) in degrees. Defaults to the whole globe.
+        tile_size (:obj:`int`): Width and height of each tile, in pixels. Defaults to 256.
+        pixels_per_cell (:obj:`float`): Size of a cell of the plot grid, in tile pixels. Defaults to 1.
+        workers (:obj:`int`): Number of processes to use to draw the tiles. Defaults to None - draw them all in this process.
+        Other keyword arguments are passed to the layer function.
+
+    Returns:
+        :obj:`list` of :obj:`str` - the files written.
+
+    |
+    """
+
+    kwargs.setdefault('zooms'          ,(0,1,2))
+    kwargs.setdefault('extent'         ,(-180,180,-90,90))
+    kwargs.setdefault('tile_size'      ,256)
+    kwargs.setdefault('pixels_per_cell',1)
+    kwargs.setdefault('workers'        ,None)
+
+    zooms=kwargs.pop('zooms')
+    extent=kwargs.pop('extent')
+    tile_size=kwargs.pop('tile_size')
+    pixels_per_cell=kwargs.pop('pixels_per_cell')
+    workers=kwargs.pop('workers')
+
+    written=[]
+    for z in zooms:
+        tiles=tiles_covering(z,extent)
+        if len(tiles)==0: continue
+        # Plot grid for the whole zoom level - covering all the tiles
+        corners=[tile_extent(*t) for t in (tiles[0],tiles[-1])]
+        region=(corners[0][0],corners[1][1],corners[1][2],corners[0][3])
+        fig,ax=_tile_axes(region,tile_size,tile_size)
+        resolution=180.0/2**z/tile_size*pixels_per_cell
+        plot_cube=utils.dummy_cube(ax,resolution)
+        zoom_cube=utils.regrid(utils.clip_to_axes(ax,pe),plot_cube)
+        zoom_cube=zoom_cube.copy(data=utils.cube_data(zoom_cube))
+
+        tasks=[(layer,_subset(zoom_cube,tile_extent(*t)),t,
+                tile_size,directory,kwargs) for t in tiles]
+        if workers is None or workers<2 or len(tasks)<2:
+            paths=[_render_tile(task) for task in tasks]
+        else:
+            with concurrent.futures.ProcessPoolExecutor(
+                               max_workers=min(workers,len(tasks))) as pool:
+                paths=list(pool.map(_render_tile,tasks))
+        written.extend([p for p in paths if p is not None])
+
+    return written
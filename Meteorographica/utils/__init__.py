@@ -13,3 +13,9 @@
 
 from .dummy_cube import *
 from .label import *
+from .contour_lines import *
+from .clip import *
+from .precision import *
+from .ensemble import *
+from .geometry_cache import *
+from .regrid import *
@@ -0,0 +1,122 @@
+# (C) British Crown Copyright 2017, Met Office
+#
+# This code is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This code is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+
+import numpy
+import cartopy.crs as ccrs
+
+from .dummy_cube import _grid_margin
+
+# Cartopy version of a cube's horizontal coordinate system
+def _cube_crs(cube):
+    cs=cube.coord('latitude').coord_system
+    if cs is None:
+        return ccrs.PlateCarree()
+    return cs.as_cartopy_crs()
+
+# Longitude range covering a set of longitudes, allowing for wrap-around.
+#  Returns None if they cover (nearly) the whole circle.
+def _longitude_range(lons,min_gap):
+    lons=numpy.sort(numpy.mod(lons,360))
+    gaps=numpy.diff(numpy.concatenate((lons,[lons[0]+360])))
+    largest=numpy.argmax(gaps)
+    if gaps[largest]<min_gap:
+        return None
+    start=lons[(largest+1)%len(lons)]
+    end=lons[largest]
+    if end<start:
+        end+=360
+    return (start,end)
+
+# Realise a cube's data, without keeping it in the cube
+def cube_data(cube):
+    """Get the data of a cube as a numpy array, without realising the cube's lazy data.
+
+    :attr:`iris.cube.Cube.data` loads lazy data and keeps it in the cube - so plotting a small region of a big cube would leave the caller with the whole cube in memory. This loads the data but leaves the cube as it was.
+
+    Args:
+        cube (:obj:`iris.cube.Cube`): Cube with data to get.
+
+    Returns:
+        :obj:`numpy.ndarray` (or :obj:`numpy.ma.MaskedArray`) - the cube's data.
+
+    |
+    """
+
+    if cube.has_lazy_data():
+        return cube.core_data().compute()
+    return cube.data
+
+# Cut a cube down to the part needed to plot on a given axes
+def clip_to_axes(ax,cube,margin=None):
+    """Cut a cube down to the region shown on an axes.
+
+    The cube is subset to the axes extent, plus a margin, transformed into the cube's own coordinate system. If the cube has lazy data, the subset is lazy as well, so only the part of the data that is needed will be read when it is used.
+
+    Args:
+        ax (:obj:`cartopy.mpl.geoaxes.GeoAxes`): Axes the cube is to be plotted on.
+        cube (:obj:`iris.cube.Cube`): Data to be plotted - must have dimensions 'latitude' and 'longitude'.
+        margin (:obj:`float`, optional): Extra space (degrees) around the axes extent to include. Defaults to None - the margin :func:`dummy_cube` adds to the plot grid, plus two grid cells of the cube.
+
+    Returns:
+        :obj:`iris.cube.Cube` - the subset of the cube. If the axes show the whole cube (or there's nothing to gain from clipping) this is the original cube.
+
+    |
+    """
+
+    lats=cube.coord('latitude').points
+    lons=cube.coord('longitude').points
+    if margin is None:
+        spacing=max(numpy.max(numpy.absolute(numpy.diff(lats)),initial=0),
+                    numpy.max(numpy.absolute(numpy.diff(lons)),initial=0))
+        margin=_grid_margin+spacing*2
+    extent=ax.get_extent()
+    x0=extent[0]-margin
+    x1=extent[1]+margin
+    y0=max(-90,extent[2]-margin)
+    y1=min(90,extent[3]+margin)
+
+    # Points over the region, in the cube's coordinate system
+    x,y=numpy.meshgrid(numpy.linspace(x0,x1,101),numpy.linspace(y0,y1,51))
+    x=numpy.concatenate((x.ravel(),numpy.linspace(x0,x1,1001),
+                                   numpy.linspace(x0,x1,1001)))
+    y=numpy.concatenate((y.ravel(),numpy.full(1001,y0),
+                                   numpy.full(1001,y1)))
+    cube_crs=_cube_crs(cube)
+    tp=cube_crs.transform_points(ax.projection,x,y)
+    region_lons=tp[:,0]
+    region_lats=tp[:,1]
+    ok=numpy.isfinite(region_lons) & numpy.isfinite(region_lats)
+    if not numpy.any(ok):
+        return cube
+    region_lons=region_lons[ok]
+    region_lats=region_lats[ok]
+    lat_range=(numpy.min(region_lats),numpy.max(region_lats))
+
+    # If the region includes a pole of the cube's grid, it covers all longitudes
+    poles=ax.projection.transform_points(cube_crs,numpy.array([0.0,0.0]),
+                                                  numpy.array([90.0,-90.0]))
+    lon_range=_longitude_range(region_lons,min_gap=margin)
+    for pole,pole_lat in zip(poles,(90,-90)):
+        if x0<=pole[0]<=x1 and y0<=pole[1]<=y1:
+            lon_range=None
+            lat_range=(min(lat_range[0],pole_lat),max(lat_range[1],pole_lat))
+
+    constraints={}
+    if lat_range[0]>numpy.min(lats) or lat_range[1]<numpy.max(lats):
+        constraints['latitude']=lat_range
+    if lon_range is not None and lon_range[1]-lon_range[0]<(
+                                 numpy.max(lons)-numpy.min(lons)):
+        constraints['longitude']=lon_range
+    if len(constraints)==0:
+        return cube
+    return cube.intersection(ignore_bounds=True,**constraints)
@@ -0,0 +1,134 @@
+# (C) British Crown Copyright 2017, Met Office
+#
+# This code is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This code is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+
+import numpy
+import concurrent.futures
+
+from .precision import get_float_dtype
+
+# Shared memory for the process pool (python>=3.8)
+try:
+    from multiprocessing import shared_memory
+except ImportError:
+    shared_memory=None
+
+# contourpy does the contouring for matplotlib>=3.6, older versions
+#  have their own contour generator.
+try:
+    import contourpy
+except ImportError:
+    contourpy=None
+    import matplotlib._contour
+
+# Make contour lines without drawing them
+def trace_contours(lons,lats,data,levels):
+    """Calculate contour lines for a 2d field, without making a :class:`matplotlib.contour.ContourSet`.
+
+    Uses the same contouring algorithm as :meth:`matplotlib.axes.Axes.contour`, so gives the same lines.
+
+    Args:
+        lons (:obj:`numpy.ndarray`): 1d array of longitudes (x coordinates).
+        lats (:obj:`numpy.ndarray`): 1d array of latitudes (y coordinates).
+        data (:obj:`numpy.ndarray`): 2d array (latitude,longitude) of values to contour - may be masked.
+        levels (iterable of :obj:`float`): Contour levels.
+
+    Returns:
+        :obj:`list` of :obj:`list` of :obj:`numpy.ndarray` - for each level, a list of (n,2) arrays of the (x,y) vertices of each contour line (same as :attr:`matplotlib.contour.ContourSet.allsegs`).
+
+    |
+    """
+
+    data=numpy.ma.masked_invalid(data,copy=False)
+    if contourpy is not None:
+        generator=contourpy.contour_generator(lons,lats,data,
+                                   name='mpl2014',corner_mask=True,
+                                   line_type=contourpy.LineType.SeparateCode)
+        return [list(generator.lines(level)[0]) for level in levels]
+
+    lons,lats=numpy.meshgrid(lons,lats)
+    generator=matplotlib._contour.QuadContourGenerator(
+                     lons,lats,data.filled(),numpy.ma.getmaskarray(data),
+                     True,0)
+    allsegs=[]
+    for level in levels:
+        segments=generator.create_contour(level)
+        if isinstance(segments,tuple): # vertices and kinds
+            segments=segments[0]
+        allsegs.append(list(segments))
+    return allsegs
+
+# Contour lines for some members of an ensemble held in shared memory
+#  - runs in a worker process.
+def _trace_shared_members(name,shape,dtype,members,lons,lats,levels):
+    shm=shared_memory.SharedMemory(name=name)
+    try:
+        data=numpy.ndarray(shape,dtype=dtype,buffer=shm.buf)
+        allsegs=[[] for level in levels]
+        for member in members:
+            for segments,member_segments in zip(allsegs,
+                           trace_contours(lons,lats,data[member],levels)):
+                segments.extend(member_segments)
+        del data
+    finally:
+        shm.close()
+    return allsegs
+
+# Contour lines for each member of an ensemble
+def trace_ensemble_contours(lons,lats,data,levels,workers=None):
+    """Calculate contour lines for every member of an ensemble.
+
+    Args:
+        lons (:obj:`numpy.ndarray`): 1d array of longitudes (x coordinates).
+        lats (:obj:`numpy.ndarray`): 1d array of latitudes (y coordinates).
+        data (:obj:`numpy.ndarray`): 3d array (member,latitude,longitude) of values to contour.
+        levels (iterable of :obj:`float`): Contour levels.
+        workers (:obj:`int`, optional): Number of processes to use. The data are shared with the worker processes through :mod:`multiprocessing.shared_memory` (not copied), and only the contour vertices come back. Defaults to None - do everything in this process.
+
+    Returns:
+        :obj:`list` of :obj:`list` of :obj:`numpy.ndarray` - for each level, a list of (n,2) arrays of the (x,y) vertices of each contour line, from all the members together (in member order).
+
+    |
+    """
+
+    if workers is None or workers<2 or data.shape[0]<2:
+        allsegs=[[] for level in levels]
+        for member in range(data.shape[0]):
+            for segments,member_segments in zip(allsegs,
+                           trace_contours(lons,lats,data[member],levels)):
+                segments.extend(member_segments)
+        return allsegs
+
+    if shared_memory is None:
+        raise Exception("Parallel contouring needs python 3.8 or later")
+    levels=list(levels)
+    data=numpy.ma.filled(numpy.ma.asarray(data,dtype=get_float_dtype()),
+                         numpy.nan)
+    shm=shared_memory.SharedMemory(create=True,size=data.nbytes)
+    try:
+        numpy.ndarray(data.shape,dtype=data.dtype,buffer=shm.buf)[:]=data
+        chunks=numpy.array_split(numpy.arange(data.shape[0]),
+                                 min(workers,data.shape[0]))
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+            futures=[pool.submit(_trace_shared_members,shm.name,data.shape,
+                                 data.dtype,chunk,lons,lats,levels)
+                     for chunk in chunks]
+            results=[future.result() for future in futures]
+    finally:
+        shm.close()
+        shm.unlink()
+
+    allsegs=[[] for level in levels]
+    for result in results:
+        for segments,chunk_segments in zip(allsegs,result):
+            segments.extend(chunk_segments)
+    return allsegs
@@ -11,31 +11,108 @@
 # GNU Lesser General Public License for more details.
 #
 
+import collections
 import iris
+import iris.cube
 import numpy
+import dask.array
+
+from .precision import get_float_dtype
+
+# The plot grid extends this far (degrees) beyond the axes extent
+_grid_margin=2
+
+# Recently made plot grids - they don't change during a video
+_dummy_cubes=collections.OrderedDict()
+_dummy_cube_cache_size=8
 
 # Make a dummy cube to use as a plot grid
-def dummy_cube(ax,resolution):
+def dummy_cube(ax,resolution,pixels_per_cell=1):
+    """Make a cube defining a lat:lon grid covering an axes.
 
-    extent=ax.get_extent()
+    The grid is in the rotated-pole coordinates of the axes projection, and extends a little beyond the axes extent. Plot functions regrid their data onto it before plotting.
+
+    Grids are remembered (by projection, extent and resolution), so asking for the same grid again returns the same cube, and the cube's data are lazy zeros - so making the grid costs no memory however fine the resolution. The cube is shared, so treat it as read-only.
+
+    Args:
+        ax (:obj:`cartopy.mpl.geoaxes.GeoAxes`): Axes to be covered. Must have a rotated-pole projection.
+        resolution (:obj:`float`): Grid spacing (degrees), or 'auto' to choose it from the size of the axes in pixels (see :func:`plot_resolution`).
+        pixels_per_cell (:obj:`float`, optional): With resolution='auto', the size of a grid cell in pixels. Defaults to 1.
+
+    Returns:
+        :obj:`iris.cube.Cube` - with dimensions 'latitude' and 'longitude'.
+
+    |
+    """
+
+    resolution=plot_resolution(ax,resolution,pixels_per_cell)
+    extent=tuple(ax.get_extent())
     pole_latitude=ax.projection.proj4_params['o_lat_p']
     pole_longitude=ax.projection.proj4_params['lon_0']-180
     npg_longitude=ax.projection.proj4_params['o_lon_p']
 
+    dtype=get_float_dtype()
+    key=(pole_latitude,pole_longitude,npg_longitude,extent,resolution,
+         dtype.str)
+    plot_cube=_dummy_cubes.pop(key,None)
+    if plot_cube is None:
+        plot_cube=_make_dummy_cube(pole_latitude,pole_longitude,
+                                   npg_longitude,extent,resolution,dtype)
+    _dummy_cubes[key]=plot_cube
+    while len(_dummy_cubes)>_dummy_cube_cache_size:
+        _dummy_cubes.popitem(last=False)
+    return plot_cube
+
+# Grid resolution to match the pixels of a figure
+def plot_resolution(ax,resolution='auto',pixels_per_cell=1):
+    """Choose a plot grid resolution from the size of the axes in pixels.
+
+    Regridding to a much finer grid than the output pixels wastes time, and a much coarser one loses detail. This finds the grid spacing (degrees) that gives each grid cell the requested size in pixels, from the axes extent and its size on the figure (figure size and dpi).
+
+    Args:
+        ax (:obj:`cartopy.mpl.geoaxes.GeoAxes`): Axes to be covered.
+        resolution (:obj:`float`, optional): If this is 'auto' (default), calculate the resolution. Otherwise return it unchanged - so plot functions can pass their resolution argument straight through.
+        pixels_per_cell (:obj:`float`, optional): Size of a grid cell in pixels - use more than 1 for smooth fields or sparse features (contours, vectors), 1 for images. Defaults to 1.
+
+    Returns:
+        :obj:`float` - grid spacing (degrees).
+
+    |
+    """
+
+    if not isinstance(resolution,str):
+        return resolution
+    if resolution!='auto':
+        raise Exception("Unsupported resolution %s" % resolution)
+    extent=ax.get_extent()
+    bbox=ax.get_window_extent()
+    degrees_per_pixel=min((extent[1]-extent[0])/bbox.width,
+                          (extent[3]-extent[2])/bbox.height)
+    # Round to 3 significant figures - avoids distinct but
+    #  indistinguishable grids from rounding noise.
+    return float('%.3g' % (degrees_per_pixel*pixels_per_cell))
+
+def _make_dummy_cube(pole_latitude,pole_longitude,npg_longitude,
+                     extent,resolution,dtype):
+
     cs=iris.coord_systems.RotatedGeogCS(pole_latitude,
                                         pole_longitude,
                                         npg_longitude)
-    lat_values=numpy.arange(extent[2]-2,extent[3]+2,resolution)
+    lat_values=numpy.arange(extent[2]-_grid_margin,
+                            extent[3]+_grid_margin,resolution)
     latitude = iris.coords.DimCoord(lat_values,
                                     standard_name='latitude',
                                     units='degrees_north',
                                     coord_system=cs)
-    lon_values=numpy.arange(extent[0]-2,extent[1]+2,resolution)
+    lon_values=numpy.arange(extent[0]-_grid_margin,
+                            extent[1]+_grid_margin,resolution)
     longitude = iris.coords.DimCoord(lon_values,
                                      standard_name='longitude',
                                      units='degrees_east',
                                      coord_system=cs)
-    dummy_data = numpy.zeros((len(lat_values), len(lon_values)))
+    # Lazy - never realised, only the coordinates are used
+    dummy_data = dask.array.zeros((len(lat_values), len(lon_values)),
+                                  dtype=dtype,chunks=-1)
     plot_cube = iris.cube.Cube(dummy_data,
                                dim_coords_and_dims=[(latitude, 0),
                                                     (longitude, 1)])
@@ -0,0 +1,95 @@
+# (C) British Crown Copyright 2017, Met Office
+#
+# This code is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This code is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+
+import iris
+import numpy
+
+from .precision import get_float_dtype
+
+# A single-field cube with the ensemble dimension collapsed, for
+#  holding a statistic of the ensemble - without reading the ensemble data.
+def _collapsed_template(cube,ensemble_dimension,method,data):
+    dim=cube.coord_dims(ensemble_dimension)[0]
+    index=[slice(None)]*cube.ndim
+    index[dim]=0
+    template=cube[tuple(index)].copy(data=data)
+    template.replace_coord(cube.coord(ensemble_dimension).collapsed())
+    template.add_cell_method(iris.coords.CellMethod(method,
+                                       coords=ensemble_dimension))
+    return template
+
+# Mean and standard deviation of an ensemble in one pass
+def ensemble_mean_spread(cube,ensemble_dimension='member',chunk_size=8):
+    """Ensemble mean and spread (standard deviation), in a single pass through the data.
+
+    Reads the ensemble a few members at a time (from the cube's lazy data, if it has any), combining the chunks with Welford's (Chan's) parallel update, so only a few members need to be in memory at once. Gives the same answers as collapsing the cube with :data:`iris.analysis.MEAN` and :data:`iris.analysis.STD_DEV`, but doesn't need the whole ensemble in memory, and reads it once instead of twice.
+
+    Args:
+        cube (:obj:`iris.cube.Cube`): Ensemble - must have an ensemble dimension.
+        ensemble_dimension (:obj:`str`, optional): Name of the ensemble dimension. Defaults to 'member'.
+        chunk_size (:obj:`int`, optional): Number of members to read at once. Defaults to 8.
+
+    Returns:
+        :obj:`tuple` of two :obj:`iris.cube.Cube` - the ensemble mean and standard deviation (with 1 delta degree of freedom, like :data:`iris.analysis.STD_DEV`). In the plot data type (see :func:`get_float_dtype`) - the sums are accumulated in float64. Masked where there is no data (or, for the spread, only one valid member).
+
+    |
+    """
+
+    dim=cube.coord_dims(ensemble_dimension)[0]
+    data=cube.core_data()
+    n_members=data.shape[dim]
+    dtype=get_float_dtype()
+
+    count=None
+    for start in range(0,n_members,chunk_size):
+        index=[slice(None)]*cube.ndim
+        index[dim]=slice(start,start+chunk_size)
+        chunk=data[tuple(index)]
+        # Realise lazy chunks first - converting a dask masked array
+        #  straight to numpy loses the mask
+        if hasattr(chunk,'compute'):
+            chunk=chunk.compute()
+        chunk=numpy.ma.masked_invalid(
+                  numpy.ma.asarray(chunk,dtype=numpy.float64))
+        valid=~numpy.ma.getmaskarray(chunk)
+        c_count=valid.sum(axis=dim)
+        c_sum=chunk.filled(0).sum(axis=dim)
+        with numpy.errstate(divide='ignore',invalid='ignore'):
+            c_mean=numpy.where(c_count>0,c_sum/c_count,0)
+        c_m2=numpy.where(valid,
+                         (chunk.filled(0)-numpy.expand_dims(c_mean,dim))**2,
+                         0).sum(axis=dim)
+        if count is None:
+            count=c_count
+            mean=c_mean
+            m2=c_m2
+            continue
+        total=count+c_count
+        delta=c_mean-mean
+        with numpy.errstate(divide='ignore',invalid='ignore'):
+            mean=numpy.where(total>0,mean+delta*c_count/total,0)
+            m2=numpy.where(total>0,m2+c_m2+delta**2*count*c_count/total,0)
+        count=total
+
+    with numpy.errstate(divide='ignore',invalid='ignore'):
+        spread=numpy.sqrt(m2/(count-1))
+    mean=numpy.ma.masked_where(count<1,mean.astype(dtype))
+    spread=numpy.ma.masked_where(count<2,spread.astype(dtype))
+    if not numpy.ma.is_masked(mean):
+        mean=mean.data
+    if not numpy.ma.is_masked(spread):
+        spread=spread.data
+
+    return (_collapsed_template(cube,ensemble_dimension,'mean',mean),
+            _collapsed_template(cube,ensemble_dimension,
+                                'standard_deviation',spread))
@@ -0,0 +1,184 @@
+# (C) British Crown Copyright 2017, Met Office
+#
+# This code is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This code is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+
+import os
+import hashlib
+import tempfile
+import numpy
+
+from .contour_lines import trace_contours
+
+# Keep contour lines on disk, so re-rendering the same field
+#  doesn't need them recalculating.
+class ContourCache(object):
+    """On-disk cache of contour line geometry.
+
+    Re-plotting the same field (with different colours, labels, or overlays) gives the same contour lines every time. Pass one of these to :func:`Meteorographica.pressure.plot_contour` or :func:`Meteorographica.pressure.plot_mean_spread` (cache=...) and the lines are calculated once, stored as a compressed numpy file, and loaded on later calls.
+
+    Entries are identified by a hash of the field data, the contour levels, the grid (as made by :func:`dummy_cube`) and the map projection. When the cache grows beyond max_size, the least-recently-used entries are deleted.
+
+    Args:
+        directory (:obj:`str`): Where to keep the cached lines - created if it doesn't exist.
+        max_size (:obj:`int`, optional): Maximum total size of the cache files (bytes). Defaults to 1Gb.
+
+    |
+    """
+
+    def __init__(self,directory,max_size=2**30):
+        self.directory=directory
+        self.max_size=max_size
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def key(self,lons,lats,data,levels,projection=None):
+        """Identifier for a set of contour lines.
+
+        Args:
+            lons (:obj:`numpy.ndarray`): 1d array of longitudes of the grid.
+            lats (:obj:`numpy.ndarray`): 1d array of latitudes of the grid.
+            data (:obj:`numpy.ndarray`): 2d array (latitude,longitude) of values to contour.
+            levels (iterable of :obj:`float`): Contour levels.
+            projection (:obj:`cartopy.crs.Projection`, optional): Map projection.
+
+        Returns:
+            :obj:`str` - hex digest identifying the contour lines.
+
+        |
+        """
+
+        h=hashlib.sha1()
+        data=numpy.ma.asarray(data)
+        for array in (lons,lats,numpy.ma.getdata(data),
+                      numpy.ma.getmaskarray(data),
+                      numpy.asarray(levels,dtype=float)):
+            array=numpy.ascontiguousarray(array)
+            h.update(str((array.shape,array.dtype.str)).encode())
+            h.update(array.tobytes())
+        if projection is not None:
+            h.update(repr(sorted(projection.proj4_params.items())).encode())
+        return h.hexdigest()
+
+    def _filename(self,key):
+        return os.path.join(self.directory,"%s.npz" % key)
+
+    def get(self,key):
+        """Load contour lines from the cache.
+
+        Args:
+            key (:obj:`str`): Identifier from :meth:`key`.
+
+        Returns:
+            Contour lines (as :func:`trace_contours`), or None if they are not in the cache.
+
+        |
+        """
+
+        filename=self._filename(key)
+        try:
+            with numpy.load(filename) as stored:
+                vertices=stored['vertices']
+                lengths=stored['lengths']
+                counts=stored['counts']
+        except (IOError,OSError,KeyError,ValueError):
+            return None
+        os.utime(filename,None) # Mark as recently used
+        segments=numpy.split(vertices,numpy.cumsum(lengths)[:-1])
+        if len(lengths)==0:
+            segments=[]
+        allsegs=[]
+        start=0
+        for count in counts:
+            allsegs.append(segments[start:start+count])
+            start+=count
+        return allsegs
+
+    def put(self,key,allsegs):
+        """Store contour lines in the cache.
+
+        Args:
+            key (:obj:`str`): Identifier from :meth:`key`.
+            allsegs: Contour lines (as :func:`trace_contours`).
+
+        Returns:
+            Nothing - writes the cache file, and deletes old files if the cache is too big.
+
+        |
+        """
+
+        segments=[numpy.asarray(s,dtype=float).reshape(-1,2)
+                  for level_segments in allsegs for s in level_segments]
+        if len(segments)>0:
+            vertices=numpy.concatenate(segments)
+        else:
+            vertices=numpy.zeros((0,2))
+        # Write to a temporary file and rename, so readers never see
+        #  a partly-written entry.
+        handle,tmp_name=tempfile.mkstemp(dir=self.directory,suffix='.tmp')
+        with os.fdopen(handle,'wb') as f:
+            numpy.savez_compressed(f,vertices=vertices,
+                      lengths=numpy.array([len(s) for s in segments],dtype=int),
+                      counts=numpy.array([len(l) for l in allsegs],dtype=int))
+        os.replace(tmp_name,self._filename(key))
+        self.evict()
+
+    def evict(self):
+        """Delete the least-recently-used entries until the cache is no bigger than max_size.
+
+        |
+        """
+
+        entries=[]
+        for name in os.listdir(self.directory):
+            if not name.endswith('.npz'): continue
+            filename=os.path.join(self.directory,name)
+            try:
+                st=os.stat(filename)
+            except OSError:
+                continue
+            entries.append((st.st_mtime,st.st_size,filename))
+        entries.sort()
+        total=sum(e[1] for e in entries)
+        for mtime,size,filename in entries:
+            if total<=self.max_size: break
+            try:
+                os.remove(filename)
+            except OSError:
+                pass
+            total-=size
+
+# Contour lines, from the cache if possible
+def cached_contours(cache,lons,lats,data,levels,projection=None):
+    """Calculate contour lines, using a :class:`ContourCache`.
+
+    Args:
+        cache (:obj:`ContourCache`): Cache to use - if None, just calculate the lines.
+        lons (:obj:`numpy.ndarray`): 1d array of longitudes of the grid.
+        lats (:obj:`numpy.ndarray`): 1d array of latitudes of the grid.
+        data (:obj:`numpy.ndarray`): 2d array (latitude,longitude) of values to contour.
+        levels (iterable of :obj:`float`): Contour levels.
+        projection (:obj:`cartopy.crs.Projection`, optional): Map projection.
+
+    Returns:
+        Contour lines (as :func:`trace_contours`).
+
+    |
+    """
+
+    if cache is None:
+        return trace_contours(lons,lats,data,levels)
+    key=cache.key(lons,lats,data,levels,projection)
+    allsegs=cache.get(key)
+    if allsegs is None:
+        allsegs=trace_contours(lons,lats,data,levels)
+        cache.put(key,allsegs)
+    return allsegs
@@ -0,0 +1,97 @@
+# (C) British Crown Copyright 2017, Met Office
+#
+# This code is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This code is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+
+# Floating-point precision used for the fields being plotted.
+#  Reanalysis data is float32, and there's no point in doubling
+#  the memory (and time) needed for every field by working in float64.
+
+import numpy
+
+_float_dtype=numpy.dtype(numpy.float32)
+
+# The data type for plot fields
+def get_float_dtype():
+    """The floating-point data type used for fields on their way to the plot.
+
+    Regridding, scaling, ensemble statistics, wind rotation and colouring all work in this data type, whatever the data type of the input. Defaults to float32.
+
+    Returns:
+        :obj:`numpy.dtype` - the current data type.
+
+    |
+    """
+
+    return _float_dtype
+
+# Change the data type for plot fields
+def set_float_dtype(dtype):
+    """Set the floating-point data type used for fields on their way to the plot.
+
+    Args:
+        dtype (:obj:`numpy.dtype`): New data type - must be a floating-point type (numpy.float32 or numpy.float64).
+
+    Returns:
+        :obj:`numpy.dtype` - the previous data type (so it can be restored).
+
+    |
+    """
+
+    global _float_dtype
+    dtype=numpy.dtype(dtype)
+    if not numpy.issubdtype(dtype,numpy.floating):
+        raise Exception("Unsupported plot data type %s" % dtype)
+    previous=_float_dtype
+    _float_dtype=dtype
+    return previous
+
+# Array as the plot data type - without a copy if it is already
+def as_float(data):
+    """Convert an array to the plot data type (see :func:`get_float_dtype`).
+
+    Works for numpy arrays, masked arrays and (lazy) dask arrays. If the array is already of the right type it is returned unchanged, not copied.
+
+    Args:
+        data (:obj:`numpy.ndarray`): Array to convert.
+
+    Returns:
+        :obj:`numpy.ndarray` (or the same type as data) - the converted array.
+
+    |
+    """
+
+    return data.astype(_float_dtype,copy=False)
+
+# Cube data, scaled, as the plot data type
+def scaled_data(cube,scale=1.0):
+    """Get the data of a cube, multiplied by a scale factor, in the plot data type.
+
+    The scaling is done in place in a single working copy - so there is one new array, of the plot data type (see :func:`get_float_dtype`), rather than an intermediate in whatever type numpy promotes to. The cube itself is not changed, and lazy data is not kept in it (as with :func:`cube_data`).
+
+    Args:
+        cube (:obj:`iris.cube.Cube`): Cube with data to get.
+        scale (:obj:`float`, optional): Multiply the data by this. Defaults to 1.
+
+    Returns:
+        :obj:`numpy.ndarray` (or :obj:`numpy.ma.MaskedArray`) - the scaled data.
+
+    |
+    """
+
+    if cube.has_lazy_data():
+        data=cube.core_data().compute().astype(_float_dtype,copy=False)
+    else:
+        # Realised data belongs to the cube - never scale it in place
+        data=cube.data.astype(_float_dtype)
+    if scale!=1:
+        data*=_float_dtype.type(scale)
+    return data
@@ -0,0 +1,375 @@
+# (C) British Crown Copyright 2017, Met Office
+#
+# This code is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This code is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+
+import collections
+import hashlib
+import iris
+import iris.cube
+import iris.analysis
+import numpy
+
+from .clip import _cube_crs
+from .clip import cube_data
+from .precision import get_float_dtype
+from .precision import as_float
+
+# Most recently used regridders, by source grid, target grid, and scheme
+_regridders=collections.OrderedDict()
+_regridder_cache_size=16
+
+# Identifier for the horizontal grid of a cube
+def grid_key(cube):
+    """Identifier for the horizontal grid of a cube - for caching anything calculated from the grid alone.
+
+    Two cubes get the same key if their latitude and longitude coordinates (points, units, coordinate system, dimensions, and whether they are circular) are the same - whatever their data.
+
+    Args:
+        cube (:obj:`iris.cube.Cube`): Cube with 'latitude' and 'longitude' coordinates.
+
+    Returns:
+        :obj:`str` - hex digest identifying the grid.
+
+    |
+    """
+
+    h=hashlib.sha1()
+    for name in ('latitude','longitude'):
+        coord=cube.coord(name)
+        h.update(repr((name,cube.coord_dims(coord),coord.units,
+                       coord.coord_system,
+                       getattr(coord,'circular',False),
+                       coord.points.shape,coord.points.dtype.str)).encode())
+        h.update(numpy.ascontiguousarray(coord.points).tobytes())
+    return h.hexdigest()
+
+# Bilinear interpolation weights from a lat:lon grid to a set of
+#  points (given in the grid's own coordinates) - calculated once,
+#  used for any data on the same grid.
+class _BilinearSampler(object):
+
+    def __init__(self,src,x,y):
+        src_lats=src.coord('latitude').points.astype(numpy.float64)
+        src_lon_coord=src.coord('longitude')
+        src_lons=src_lon_coord.points.astype(numpy.float64)
+        x=numpy.asarray(x,dtype=numpy.float64)
+        y=numpy.asarray(y,dtype=numpy.float64)
+
+        # Longitudes - put the points in the source range (to the
+        #  nearest multiple of 360 degrees) and wrap circular grids.
+        self.lon_flip=src_lons[0]>src_lons[-1]
+        if self.lon_flip:
+            src_lons=src_lons[::-1]
+        centre=(src_lons[0]+src_lons[-1])/2.0
+        x=centre+numpy.mod(x-centre+180,360)-180
+        self.circular=bool(getattr(src_lon_coord,'circular',False))
+        if self.circular:
+            x=src_lons[0]+numpy.mod(x-src_lons[0],360)
+            src_lons=numpy.append(src_lons,src_lons[0]+360)
+        self.lat_flip=src_lats[0]>src_lats[-1]
+        if self.lat_flip:
+            src_lats=src_lats[::-1]
+
+        # Cell indices and weights - extrapolating linearly outside
+        #  the grid, like iris.analysis.Linear()
+        self.ix0,self.wx=self._weights(src_lons,x)
+        self.iy0,self.wy=self._weights(src_lats,y)
+        self.ix1=self.ix0+1
+        if self.circular:
+            self.ix1=numpy.where(self.ix1==len(src_lons)-1,0,self.ix1)
+
+    @staticmethod
+    def _weights(points,values):
+        idx=numpy.searchsorted(points,values)-1
+        idx=numpy.clip(idx,0,len(points)-2)
+        weight=(values-points[idx])/(points[idx+1]-points[idx])
+        return idx,weight
+
+    # Interpolate data with (latitude,longitude) as the last two dimensions
+    def __call__(self,data,dtype=None):
+        if self.lat_flip:
+            data=data[...,::-1,:]
+        if self.lon_flip:
+            data=data[...,::-1]
+        if dtype is None:
+            dtype=get_float_dtype()
+        wx=self.wx.astype(dtype)
+        wy=self.wy.astype(dtype)
+        masked=numpy.ma.is_masked(data)
+        # Masked points may hold anything (even NaN) - zero them, so a
+        #  masked corner with zero weight adds nothing
+        values=numpy.ma.filled(data,0) if masked else numpy.ma.getdata(data)
+        # Convert the corner values as they are gathered - not the
+        #  whole source field, and no float64 intermediates
+        corner=lambda iy,ix: values[...,iy,ix].astype(dtype,copy=False)
+        result=((corner(self.iy0,self.ix0)*(1-wx)+
+                 corner(self.iy0,self.ix1)*wx)*(1-wy)+
+                (corner(self.iy0+1,self.ix0)*(1-wx)+
+                 corner(self.iy0+1,self.ix1)*wx)*wy)
+        if masked:
+            # Masked if any corner that contributes (non-zero weight)
+            #  is masked - as iris.analysis.Linear
+            mask=numpy.ma.getmaskarray(data)
+            x0=self.wx!=1
+            x1=self.wx!=0
+            y0=self.wy!=1
+            y1=self.wy!=0
+            mask=((mask[...,self.iy0,self.ix0] & x0 & y0) |
+                  (mask[...,self.iy0,self.ix1] & x1 & y0) |
+                  (mask[...,self.iy0+1,self.ix0] & x0 & y1) |
+                  (mask[...,self.iy0+1,self.ix1] & x1 & y1))
+            result=numpy.ma.masked_array(result,mask)
+        return result
+
+# Data from a cube, with latitude and longitude as the last two dimensions
+def _horizontal_last(cube):
+    lat_dim=cube.coord_dims('latitude')[0]
+    lon_dim=cube.coord_dims('longitude')[0]
+    other_dims=[d for d in range(cube.ndim) if d not in (lat_dim,lon_dim)]
+    order=other_dims+[lat_dim,lon_dim]
+    return numpy.ma.asarray(cube_data(cube)).transpose(order),order
+
+# Bilinear interpolation weights from one lat:lon grid to another -
+#  calculated once, used for any cube on the same source grid.
+class _LinearRegridder(object):
+
+    def __init__(self,src,target):
+        tgt_lats=target.coord('latitude')
+        tgt_lons=target.coord('longitude')
+        self.target_lat=tgt_lats.copy()
+        self.target_lon=tgt_lons.copy()
+
+        # Target grid points, in source coordinates
+        x,y=numpy.meshgrid(tgt_lons.points.astype(numpy.float64),
+                           tgt_lats.points.astype(numpy.float64))
+        src_crs=_cube_crs(src)
+        tgt_crs=_cube_crs(target)
+        if src_crs!=tgt_crs:
+            tp=src_crs.transform_points(tgt_crs,x,y)
+            x=tp[...,0]
+            y=tp[...,1]
+        self.sampler=_BilinearSampler(src,x,y)
+
+    def __call__(self,cube):
+        lat_dim=cube.coord_dims('latitude')[0]
+        lon_dim=cube.coord_dims('longitude')[0]
+        data,order=_horizontal_last(cube)
+        result=self.sampler(data)
+        # Back to the original order of dimensions
+        result=result.transpose(numpy.argsort(order))
+        return self._result_cube(cube,result,lat_dim,lon_dim)
+
+    def _result_cube(self,cube,data,lat_dim,lon_dim):
+        result=iris.cube.Cube(data)
+        result.metadata=cube.metadata
+        horizontal=set((lat_dim,lon_dim))
+        for coord in cube.dim_coords:
+            dims=cube.coord_dims(coord)
+            if not horizontal.intersection(dims):
+                result.add_dim_coord(coord.copy(),dims)
+        for coord in cube.aux_coords:
+            dims=cube.coord_dims(coord)
+            if not horizontal.intersection(dims):
+                result.add_aux_coord(coord.copy(),dims)
+        result.add_dim_coord(self.target_lat.copy(),lat_dim)
+        result.add_dim_coord(self.target_lon.copy(),lon_dim)
+        return result
+
+# Are grid points evenly spaced?
+def evenly_spaced(points):
+    """Check whether a set of grid points are evenly spaced - so data on the grid can be drawn as an image.
+
+    Args:
+        points (:obj:`numpy.ndarray`): 1d array of grid point positions (latitudes or longitudes).
+
+    Returns:
+        :obj:`bool` - True if there are at least two points, and the steps between them are all the same (to within 1%).
+
+    |
+    """
+
+    if len(points)<2:
+        return False
+    steps=numpy.diff(points)
+    return numpy.ptp(steps)<0.01*numpy.absolute(steps.mean())
+
+# Spacing of a regular coordinate - None if it's irregular
+def _spacing(coord):
+    points=coord.points
+    if not evenly_spaced(points):
+        return None
+    return numpy.absolute(numpy.diff(points).mean())
+
+# Average a cube over blocks of points along one horizontal
+#  dimension. Weighted by cos(latitude) along the latitude dimension,
+#  so the block means are area-weighted. If size doesn't divide the
+#  dimension, the last block is short.
+def _block_mean_axis(cube,name,size):
+    coord=cube.coord(name)
+    dim=cube.coord_dims(coord)[0]
+    data=cube_data(cube)
+    dtype=get_float_dtype()
+    n_points=data.shape[dim]
+    n_blocks=-(-n_points//size)
+    n_pad=n_blocks*size-n_points
+    block_shape=data.shape[:dim]+(n_blocks,size)+data.shape[dim+1:]
+    if name=='latitude':
+        weights=numpy.maximum(numpy.cos(numpy.radians(coord.points)),0)
+    else:
+        weights=numpy.ones(n_points)
+    weights=weights.astype(dtype)
+    values=numpy.ma.getdata(data).astype(dtype,copy=False)
+    invalid=numpy.ma.getmaskarray(data)
+    # Pad a short last block with missing points (weight 0)
+    if n_pad>0:
+        pad=[(0,0)]*data.ndim
+        pad[dim]=(0,n_pad)
+        weights=numpy.pad(weights,(0,n_pad))
+        values=numpy.pad(values,pad)
+        invalid=numpy.pad(invalid,pad,constant_values=True)
+    weights=weights.reshape(n_blocks,size)
+    # Move the within-block axis to the end, so the weighted sum
+    #  is a single matrix-vector product for each block
+    values=numpy.moveaxis(values.reshape(block_shape),dim+1,-1)
+    invalid=(numpy.moveaxis(invalid.reshape(block_shape),dim+1,-1)|
+             numpy.isnan(values))
+    w_shape=(n_blocks,)+(1,)*(data.ndim-dim-1)+(size,)
+    weights=weights.reshape(w_shape)
+    if invalid.any():
+        weights=numpy.where(invalid,0,weights)
+        values=numpy.where(invalid,0,values)
+        sum_weights=weights.sum(axis=-1)
+        with numpy.errstate(divide='ignore',invalid='ignore'):
+            mean=numpy.ma.masked_where(sum_weights==0,
+                              (values*weights).sum(axis=-1)/sum_weights)
+    else:
+        mean=(numpy.einsum('...i,...i->...',values,weights,dtype=dtype)/
+              weights.sum(axis=-1))
+    mean=mean.astype(dtype,copy=False)
+
+    index=[slice(None)]*cube.ndim
+    index[dim]=slice(0,None,size)
+    result=cube[tuple(index)].copy(data=mean)
+    ends=numpy.minimum(numpy.arange(size-1,n_blocks*size,size),n_points-1)
+    bounds=None
+    if coord.has_bounds():
+        bounds=numpy.stack((coord.bounds[0::size,0],
+                            coord.bounds[ends,1]),axis=-1)
+    points=numpy.add.reduceat(coord.points,numpy.arange(0,n_points,size))
+    points=points/numpy.diff(numpy.append(numpy.arange(0,n_points,size),
+                                          n_points))
+    result.replace_coord(coord.copy(points=points,bounds=bounds))
+    return result
+
+# Average blocks of points of a source much finer than the target grid
+def block_mean(cube,target):
+    """Reduce the resolution of a cube by averaging blocks of grid points, if it is much finer than a target grid.
+
+    Interpolating a fine grid onto a much coarser one is slow, and aliased (each target point sees only the source points around it). If the source grid spacing goes into the target spacing at least twice, along latitude or longitude, this replaces blocks of source points with their (area-weighted) mean first. Block sizes are chosen to divide the grid exactly where possible, so global grids stay global - otherwise (a 721-point latitude grid, for example) the last block is short, rather than leaving that dimension unaveraged. The grids need not be aligned, or in the same coordinate system - the result is still interpolated onto the target, just from a grid of similar resolution.
+
+    Args:
+        cube (:obj:`iris.cube.Cube`): Data - must have dimensions 'latitude' and 'longitude'.
+        target (:obj:`iris.cube.Cube`): Cube defining the target grid - usually from :func:`dummy_cube`.
+
+    Returns:
+        :obj:`iris.cube.Cube` - the block-averaged data (or the original cube, if it is not much finer than the target).
+
+    |
+    """
+
+    spacings=[_spacing(target.coord(name))
+              for name in ('latitude','longitude')]
+    if None in spacings:
+        return cube
+    target_spacing=min(spacings)
+    for name in ('latitude','longitude'):
+        spacing=_spacing(cube.coord(name))
+        if spacing is None: continue
+        n_points=len(cube.coord(name).points)
+        factor=min(int(target_spacing/spacing),n_points)
+        if factor<2: continue
+        # Prefer a block size that divides the grid exactly (so
+        #  global grids stay global), if there's one nearly as big
+        sizes=[s for s in range(max(2,(factor+1)//2),factor+1)
+               if n_points%s==0]
+        if len(sizes)>0:
+            cube=_block_mean_axis(cube,name,max(sizes))
+        else:
+            cube=_block_mean_axis(cube,name,factor)
+    return cube
+
+# Regrid a cube, re-using the interpolation weights where possible
+def regrid(cube,target,scheme=None,block_average=True):
+    """Regrid a cube onto the lat:lon grid of another cube.
+
+    The same as :meth:`iris.cube.Cube.regrid`, except that the regridding weights are kept (for the most recently used grids) and re-used. Calculating the weights (in particular transforming the target grid into the coordinate system of the source) is the expensive part of regridding, and when plotting several variables from the same source onto the same axes, or many frames of a video, the grids are always the same.
+
+    Only :class:`iris.analysis.Linear` (with the default 'linear' extrapolation) uses the weights cache - other schemes are passed to :meth:`iris.cube.Cube.regrid`.
+
+    Args:
+        cube (:obj:`iris.cube.Cube`): Data to regrid - must have dimensions 'latitude' and 'longitude'.
+        target (:obj:`iris.cube.Cube`): Cube defining the new grid - usually from :func:`dummy_cube`.
+        scheme (optional): Regridding scheme. Defaults to None - :class:`iris.analysis.Linear`.
+        block_average (:obj:`bool`, optional): If the source grid is much finer than the target, average blocks of source points before regridding (see :func:`block_mean`). Defaults to True.
+
+    Returns:
+        :obj:`iris.cube.Cube` - the regridded data.
+
+    |
+    """
+
+    if scheme is None:
+        scheme=iris.analysis.Linear()
+    if block_average:
+        cube=block_mean(cube,target)
+    if (type(scheme) is not iris.analysis.Linear or
+        scheme.extrapolation_mode!='linear'):
+        result=cube.regrid(target,scheme)
+        return result.copy(data=as_float(result.core_data()))
+
+    key=(grid_key(cube),grid_key(target),
+         type(scheme).__name__,scheme.extrapolation_mode)
+    regridder=_regridders.pop(key,None)
+    if regridder is None:
+        regridder=_LinearRegridder(cube,target)
+    _regridders[key]=regridder
+    while len(_regridders)>_regridder_cache_size:
+        _regridders.popitem(last=False)
+    return regridder(cube)
+
+# Interpolate a cube to a set of scattered points, all in one go
+def sample_points(cube,lats,lons,dtype=None):
+    """Interpolate a cube to a set of points.
+
+    Bilinear, and extrapolates linearly outside the grid - the same as :class:`iris.analysis.Linear`, but all the points are done in one vectorised call instead of one interpolator call per point. Longitudes are wrapped onto the grid (to the nearest multiple of 360 degrees), and on circular grids, points between the last and first longitudes interpolate across the seam.
+
+    Args:
+        cube (:obj:`iris.cube.Cube`): Data - must have dimensions 'latitude' and 'longitude'. Can have other dimensions too.
+        lats (:obj:`numpy.ndarray`): Latitudes of the points, in the coordinate system of the cube.
+        lons (:obj:`numpy.ndarray`): Longitudes of the points - same shape as lats.
+        dtype (:obj:`numpy.dtype`, optional): Data type of the result. Defaults to None - the plot data type (see :func:`get_float_dtype`).
+
+    Returns:
+        :obj:`numpy.ndarray` - values at the points. Dimensions are any non-horizontal dimensions of the cube (in order), followed by the dimensions of lats. Masked if any of the grid points used are masked.
+
+    |
+    """
+
+    lats=numpy.asarray(lats)
+    lons=numpy.asarray(lons)
+    if lats.shape!=lons.shape:
+        raise Exception("Latitudes and longitudes have different shapes %s %s" %
+                             (lats.shape,lons.shape))
+    sampler=_BilinearSampler(cube,lons.ravel(),lats.ravel())
+    data,order=_horizontal_last(cube)
+    result=sampler(data,dtype=dtype)
+    return result.reshape(result.shape[:-1]+lats.shape)
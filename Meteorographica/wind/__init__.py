@@ -13,3 +13,5 @@
 
 from .plot import *
 from .wind_vectors import *
+from .rotate import *
+from .trails import *
@@ -13,10 +13,72 @@
 
 import iris
 import matplotlib
+import matplotlib.collections
 import numpy
 
 import Meteorographica.utils as utils
 from .wind_vectors import *
+from .rotate import *
+from .trails import *
+
+# Rotate winds into the plot coordinates, and put them on the plot grid
+def regrid_winds(ax,ue,ve,resolution):
+    """Winds on the plot grid, with components along the plot axes.
+
+    Clips the winds to the region of the axes, rotates them to the plot projection (see :func:`rotate_winds`), and regrids them onto a plot-coordinate grid (see :func:`Meteorographica.utils.dummy_cube`). This is the wind field :func:`plot_quiver` draws from - use it to advect a point set between frames with :func:`advect_vector_points`.
+
+    Args:
+        ax (:obj:`cartopy.mpl.geoaxes.GeoAxes`): Axes to be drawn on.
+        ue (:obj:`iris.cube.Cube`): Zonal wind - must have dimensions 'latitude' and 'longitude'.
+        ve (:obj:`iris.cube.Cube`): Meridional wind - same grid as ue.
+        resolution (:obj:`float`): Grid resolution (in degrees).
+
+    Returns:
+        :obj:`tuple` of two :obj:`iris.cube.Cube` - zonal and meridional wind, in plot coordinates.
+
+    |
+    """
+
+    ue=utils.clip_to_axes(ax,ue)
+    ve=utils.clip_to_axes(ax,ve)
+    rw=rotate_winds(ue,ve,ax.projection)
+    plot_cube=utils.dummy_cube(ax,resolution)
+    return (utils.regrid(rw[0],plot_cube),
+            utils.regrid(rw[1],plot_cube))
+
+# New vector points - in parallel if there are workers to use
+def _allocate_points(workers,**kwargs):
+    if workers is None:
+        return allocate_vector_points(**kwargs)
+    return allocate_vector_points_parallel(workers=workers,**kwargs)
+
+# Region to allocate vector points over
+def point_ranges(ax,u_p):
+    """Region of a plot to cover with wind vector points.
+
+    The range of the plot grid - unless the axes go all the way round in longitude, in which case the longitude range is exactly 360 degrees and periodic, so there's no seam where the ends of the range meet.
+
+    Args:
+        ax (:obj:`cartopy.mpl.geoaxes.GeoAxes`): Axes to be drawn on.
+        u_p (:obj:`iris.cube.Cube`): Wind on the plot grid - from :func:`regrid_winds`.
+
+    Returns:
+        :obj:`dict` - 'lat_range', 'lon_range', and 'periodic' arguments for :func:`allocate_vector_points`, :func:`advect_vector_points` or :func:`advance_trails`.
+
+    |
+    """
+
+    lats=u_p.coord('latitude').points
+    lons=u_p.coord('longitude').points
+    lat_range=(max(min(lats),-90),min(max(lats),90))
+    x_lim=ax.get_xlim()
+    if x_lim[1]-x_lim[0]>=359.99:
+        return {'lat_range':lat_range,
+                'lon_range':(x_lim[0],x_lim[0]+360),
+                'periodic' :True}
+    return {'lat_range':lat_range,
+            'lon_range':(min(lons),max(lons)),
+            'periodic' :False}
 
 def plot_quiver(ax,ue,ve,**kwargs):
     """Plots a pair of variables as a 2d field of arrows.
@@ -31,11 +93,16 @@ def plot_quiver(ax,ue,ve,**kwargs):
         ve (:obj:`iris.cube.Cube`): zonal value of  variable to plot.
 
     Keyword Args:
-        resolution (:obj:`float`): What lat:lon resolution (in degrees) to interpolate [uv]e.data to before plotting. Defaults to 1 degree.
+        resolution (:obj:`float`): What lat:lon resolution (in degrees) to interpolate [uv]e.data to before plotting. If 'auto', choose it from the figure size, dpi and axes extent (see :func:`Meteorographica.utils.plot_resolution`). Defaults to 1 degree.
+        pixels_per_cell (:obj:`float`): With resolution='auto', the size of a grid cell in pixels. Defaults to 20.
         colors (see :mod:`matplotlib.colors`) vector colour. Defaults to (0,0,0,0.25).
         headwidth (:obj:`float`): Controls arrow shape. Defaults to 1.
         random_state (None|:obj:`int`|:obj:`numpy.random.RandomState`): Random number generation seed, see :func:`sklearn.utils.check_random_state`.
         max_points (:obj:`int`): Maximum number of vectors to allocate, defaults to 100,000.
+        points (:obj:`dict`): Where to draw the vectors - output from :func:`allocate_vector_points` or :func:`advect_vector_points`, in plot coordinates. Defaults to None - allocate a new set of points.
+        scale (:obj:`float`): Separation between newly allocated points (in degrees). Defaults to None - the same as resolution.
+        metric (:obj:`str`): How to measure the separation of new points - 'plot' or 'sphere', see :func:`allocate_vector_points`. Defaults to 'plot'.
+        workers (:obj:`int`): Number of processes to use allocating new points (see :func:`allocate_vector_points_parallel`). Defaults to None - allocate them serially.
         zorder (:obj:`float`): Standard matplotlib parameter determining which things are plotted on top (high zorder), and which underneath (low zorder), Defaults to 50.
 
     Returns:
@@ -46,42 +113,32 @@ def plot_quiver(ax,ue,ve,**kwargs):
 
     kwargs.setdefault('points'      ,None)
     kwargs.setdefault('scale'       ,None)
+    kwargs.setdefault('metric'      ,'plot')
+    kwargs.setdefault('workers'     ,None)
     kwargs.setdefault('resolution'  ,1)
+    kwargs.setdefault('pixels_per_cell',20)
     kwargs.setdefault('color'       ,(0,0,0,0.25))
     kwargs.setdefault('headwidth'   ,1)
     kwargs.setdefault('random_state',None)
     kwargs.setdefault('max_points'  ,100000)
     kwargs.setdefault('zorder'      ,50)
 
-    pole_latitude=ax.projection.proj4_params['o_lat_p']
-    pole_longitude=ax.projection.proj4_params['lon_0']-180
-    projection_iris=iris.coord_systems.RotatedGeogCS(pole_latitude,
-                                                     pole_longitude)
-    rw=iris.analysis.cartography.rotate_winds(ue,ve,projection_iris)
-    plot_cube=utils.dummy_cube(ax,kwargs.get('resolution'))
-    u_p = rw[0].regrid(plot_cube,iris.analysis.Linear())
-    v_p = rw[1].regrid(plot_cube,iris.analysis.Linear())
-    if kwargs.get('points') is None:
+    kwargs['resolution']=utils.plot_resolution(ax,kwargs.get('resolution'),
+                                       kwargs.get('pixels_per_cell'))
+    u_p,v_p=regrid_winds(ax,ue,ve,kwargs.get('resolution'))
+    points=kwargs.get('points')
+    if points is None:
         if kwargs.get('scale') is None: kwargs['scale']=kwargs.get('resolution')
-        points=allocate_vector_points(initial_points=None,
-                                      lat_range=(min(u_p.coord('latitude').points),
-                                                 max(u_p.coord('latitude').points)),
-                                      lon_range=(min(u_p.coord('longitude').points),
-                                                 max(u_p.coord('longitude').points)),
-                                      scale=kwargs.get('scale'),
-                                      random_state=kwargs.get('random_state'),
-                                      max_points=kwargs.get('max_points'))
+        points=_allocate_points(kwargs.get('workers'),
+                                scale=kwargs.get('scale'),
+                                random_state=kwargs.get('random_state'),
+                                max_points=kwargs.get('max_points'),
+                                metric=kwargs.get('metric'),
+                                **point_ranges(ax,u_p))
     lats = points['Latitude']
     lons = points['Longitude']
-    u_interpolator = iris.analysis.Linear().interpolator(u_p, 
-                                    ['latitude', 'longitude'])
-    v_interpolator = iris.analysis.Linear().interpolator(v_p, 
-                                    ['latitude', 'longitude'])
-    u_i=numpy.zeros(lons.size)
-    v_i=numpy.zeros(lons.size)
-    for i in range(lons.size):
-        u_i[i]=u_interpolator([lats[i],lons[i]]).data*-1
-        v_i[i]=v_interpolator([lats[i],lons[i]]).data*-1
+    u_i=utils.sample_points(u_p,lats,lons)*-1
+    v_i=utils.sample_points(v_p,lats,lons)*-1
     qv=ax.quiver(lons,lats,u_i,v_i,
                             headwidth=kwargs.get('headwidth'),
                             color=kwargs.get('color'),
@@ -90,6 +147,86 @@ def plot_quiver(ax,ue,ve,**kwargs):
     return qv
 
 
+def plot_streamlines(ax,ue,ve,**kwargs):
+    """Plots a pair of variables as a field of short streamlines (particle trails).
+
+    Seed points are spread evenly over the plot (with :func:`allocate_vector_points`), and a trail is integrated downwind from each (with :func:`make_trails`). All the trails are drawn as a single :class:`matplotlib.collections.LineCollection`, so this scales to ~100,000 trails.
+
+    For an animation, make the trails once, and then move them on each frame with :func:`advance_trails` (on winds from :func:`regrid_winds`) and pass them in with the 'trails' argument - only trails that are new in that frame need integrating.
+
+    Args:
+        ax (:obj:`cartopy.mpl.geoaxes.GeoAxes`): Axes on which to draw.
+        ue (:obj:`iris.cube.Cube`): Zonal wind (m/s) - must have dimensions 'latitude' and 'longitude'.
+        ve (:obj:`iris.cube.Cube`): Meridional wind (m/s) - same grid as ue.
+
+    Keyword Args:
+        resolution (:obj:`float`): What lat:lon resolution (in degrees) to interpolate [uv]e.data to before integrating. If 'auto', choose it from the figure size, dpi and axes extent (see :func:`Meteorographica.utils.plot_resolution`). Defaults to 1 degree.
+        pixels_per_cell (:obj:`float`): With resolution='auto', the size of a grid cell in pixels. Defaults to 20.
+        points (:obj:`dict`): Seed points - output from :func:`allocate_vector_points` or :func:`advect_vector_points`, in plot coordinates. Defaults to None - allocate a new set of points.
+        trails (:obj:`dict`): Trails to draw - output from :func:`make_trails` or :func:`advance_trails`. If given, ue, ve, and points are not used. Defaults to None - make them from the seed points.
+        scale (:obj:`float`): Separation between newly allocated seed points (in degrees). Defaults to None - the same as resolution.
+        metric (:obj:`str`): How to measure the separation of new seed points - 'plot' or 'sphere', see :func:`allocate_vector_points`. Defaults to 'plot'.
+        workers (:obj:`int`): Number of processes to use allocating new seed points (see :func:`allocate_vector_points_parallel`). Defaults to None - allocate them serially.
+        n_steps (:obj:`int`): Number of time steps in each trail. Defaults to 10.
+        dt (:obj:`float`): Length of each time step (s). Defaults to None - a 10 m/s wind makes a trail as long as the seed point separation.
+        random_state (None|:obj:`int`|:obj:`numpy.random.RandomState`): Random number generation seed, see :func:`sklearn.utils.check_random_state`.
+        max_points (:obj:`int`): Maximum number of trails to allocate, defaults to 100,000.
+        color (see :mod:`matplotlib.colors`) trail colour. Defaults to (0,0,0,0.25).
+        linewidths (:obj:`float`): Trail line width. Defaults to 0.5.
+        zorder (:obj:`float`): Standard matplotlib parameter determining which things are plotted on top (high zorder), and which underneath (low zorder), Defaults to 50.
+
+    Returns:
+        :obj:`matplotlib.collections.LineCollection` - also adds the trails to the plot.
+
+    |
+    """
+
+    kwargs.setdefault('resolution'  ,1)
+    kwargs.setdefault('pixels_per_cell',20)
+    kwargs.setdefault('points'      ,None)
+    kwargs.setdefault('trails'      ,None)
+    kwargs.setdefault('scale'       ,None)
+    kwargs.setdefault('metric'      ,'plot')
+    kwargs.setdefault('workers'     ,None)
+    kwargs.setdefault('n_steps'     ,10)
+    kwargs.setdefault('dt'          ,None)
+    kwargs.setdefault('random_state',None)
+    kwargs.setdefault('max_points'  ,100000)
+    kwargs.setdefault('color'       ,(0,0,0,0.25))
+    kwargs.setdefault('linewidths'  ,0.5)
+    kwargs.setdefault('zorder'      ,50)
+
+    trails=kwargs.get('trails')
+    if trails is None:
+        kwargs['resolution']=utils.plot_resolution(ax,kwargs.get('resolution'),
+                                           kwargs.get('pixels_per_cell'))
+        if kwargs.get('scale') is None: kwargs['scale']=kwargs.get('resolution')
+        if kwargs.get('dt') is None:
+            kwargs['dt']=(kwargs.get('scale')*metres_per_degree/
+                          (10.0*kwargs.get('n_steps')))
+        u_p,v_p=regrid_winds(ax,ue,ve,kwargs.get('resolution'))
+        points=kwargs.get('points')
+        if points is None:
+            points=_allocate_points(kwargs.get('workers'),
+                                    scale=kwargs.get('scale'),
+                                    random_state=kwargs.get('random_state'),
+                                    max_points=kwargs.get('max_points'),
+                                    metric=kwargs.get('metric'),
+                                    **point_ranges(ax,u_p))
+        trails=make_trails(points,u_p,v_p,kwargs.get('dt'),
+                           n_steps=kwargs.get('n_steps'))
+
+    lc=matplotlib.collections.LineCollection(
+                       numpy.stack((trails['Longitude'],trails['Latitude']),
+                                   axis=-1),
+                       colors=kwargs.get('color'),
+                       linewidths=kwargs.get('linewidths'),
+                       linestyle='solid',
+                       zorder=kwargs.get('zorder'))
+    ax.add_collection(lc,autolim=False)
+    return lc
+
+
 # Plot wind
 def plot(ax,ue,ve,**kwargs):
     """Plot precipitation.
@@ -103,7 +240,7 @@ def plot(ax,ue,ve,**kwargs):
 
 
     Kwargs:
-        type (:obj:`str`, optional): Style to plot. Default is 'quiver', which delegates plotting to :meth:`plot_quiver` and at the moment this is the only choice. 
+        type (:obj:`str`, optional): Style to plot. Default is 'quiver', which delegates plotting to :meth:`plot_quiver`. 'streamlines' delegates to :meth:`plot_streamlines`.
         Other keyword arguments are passed to the style-specific plotting function.
 
     |
@@ -113,6 +250,8 @@ def plot(ax,ue,ve,**kwargs):
 
     if kwargs.get('type')=='quiver':
         return plot_quiver(ax,ue,ve,**kwargs)
+    if kwargs.get('type')=='streamlines':
+        return plot_streamlines(ax,ue,ve,**kwargs)
 
     raise Exception('Unsupported wind plot type %s' %
                          kwargs.get('type'))
@@ -0,0 +1,88 @@
+# (C) British Crown Copyright 2017, Met Office
+#
+# This code is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This code is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+
+import collections
+import numpy
+import cartopy.crs as ccrs
+
+import Meteorographica.utils as utils
+
+# Most recently used rotations, by source grid and target projection
+_rotations=collections.OrderedDict()
+_rotation_cache_size=16
+
+# Cartopy projection for a cube's horizontal coordinate system
+#  (vectors can't be transformed from a Geodetic crs).
+def _cube_projection(cube):
+    cs=cube.coord('latitude').coord_system
+    if cs is None:
+        return ccrs.PlateCarree()
+    return cs.as_cartopy_projection()
+
+# Cosine and sine of the angle between the source grid's east
+#  and the target projection's x direction, at each grid point,
+#  as arrays with dimensions (latitude,longitude).
+def _rotation_angles(cube,target_crs):
+    key=(utils.grid_key(cube),target_crs.proj4_init)
+    if key in _rotations:
+        _rotations.move_to_end(key)
+        return _rotations[key]
+    x,y=numpy.meshgrid(cube.coord('longitude').points.astype(numpy.float64),
+                       cube.coord('latitude').points.astype(numpy.float64))
+    src_crs=_cube_projection(cube)
+    east=target_crs.transform_vectors(src_crs,x,y,
+                                      numpy.ones(x.shape),numpy.zeros(x.shape))
+    # The vector is in degrees of the target grid - a degree of
+    #  longitude is shorter than a degree of latitude by cos(latitude)
+    target_lats=target_crs.transform_points(src_crs,x,y)[...,1]
+    east_x=east[0]*numpy.cos(numpy.radians(target_lats))
+    length=numpy.hypot(east_x,east[1])
+    angles=(east_x/length,east[1]/length)
+    _rotations[key]=angles
+    if len(_rotations)>_rotation_cache_size:
+        _rotations.popitem(last=False)
+    return angles
+
+# Rotate wind vectors to be relative to a new projection
+def rotate_winds(ue,ve,target_crs):
+    """Rotate wind components from their grid's directions to those of another projection.
+
+    Only the vector directions are rotated - the results stay on the source grid. The angle between the two sets of directions is found once for each source grid and target projection, and cached, so rotating another pair of fields on the same grid is just a vectorised multiply. The rotated winds are in the plot data type (see :func:`Meteorographica.utils.get_float_dtype`). Clip the winds to the region needed first (:func:`Meteorographica.utils.clip_to_axes`) - then only that subset is rotated.
+
+    Args:
+        ue (:obj:`iris.cube.Cube`): Zonal wind - must have dimensions 'latitude' and 'longitude'.
+        ve (:obj:`iris.cube.Cube`): Meridional wind - same grid as ue.
+        target_crs (:obj:`cartopy.crs.CRS`): Projection to rotate the winds into - usually the projection of the axes.
+
+    Returns:
+        :obj:`tuple` of two :obj:`iris.cube.Cube` - components along x and y of the target projection.
+
+    |
+    """
+
+    cos_a,sin_a=_rotation_angles(ue,target_crs)
+    lat_dim=ue.coord_dims('latitude')[0]
+    lon_dim=ue.coord_dims('longitude')[0]
+    if lat_dim>lon_dim:
+        cos_a=cos_a.T
+        sin_a=sin_a.T
+    shape=[1]*ue.ndim
+    shape[lat_dim]=len(ue.coord('latitude').points)
+    shape[lon_dim]=len(ue.coord('longitude').points)
+    dtype=utils.get_float_dtype()
+    u=utils.cube_data(ue).astype(dtype,copy=False)
+    v=utils.cube_data(ve).astype(dtype,copy=False)
+    cos_a=cos_a.reshape(shape).astype(dtype)
+    sin_a=sin_a.reshape(shape).astype(dtype)
+    return (ue.copy(data=u*cos_a-v*sin_a),
+            ve.copy(data=u*sin_a+v*cos_a))
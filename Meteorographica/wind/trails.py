@@ -0,0 +1,116 @@
+# (C) British Crown Copyright 2017, Met Office
+#
+# This code is free software: you can redistribute it and/or modify it under
+# the terms of the GNU Lesser General Public License as published by the
+# Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This code is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+
+# Particle trails - short streamlines that follow the wind from
+#  frame to frame.
+
+import numpy
+
+from .wind_vectors import _allocate_vector_points
+from .wind_vectors import _rk2_step
+
+# Grow a trail from each of a set of points
+def make_trails(points,u,v,dt,n_steps=10):
+    """Integrate a set of seed points through a wind field, making a short trail from each.
+
+    All the trails are integrated together, with a vectorised midpoint (2nd order Runge-Kutta) step - the only Python loop is over the n_steps time steps.
+
+    Args:
+        points (:obj:`dict`): Seed points - output from :func:`allocate_vector_points`.
+        u (:obj:`iris.cube.Cube`): Zonal wind (m/s) - must have dimensions 'latitude' and 'longitude', in the same coordinate system as the points (see :func:`regrid_winds`).
+        v (:obj:`iris.cube.Cube`): Meridional wind (m/s) - same grid as u.
+        dt (:obj:`float`): Time step (s).
+        n_steps (:obj:`int`, optional): Number of time steps in each trail. Defaults to 10.
+
+    Returns:
+        :obj:`dict`: Dictionary with components 'Longitude', 'Latitude' (both arrays of float, with dimensions (trail,n_steps+1), tail first and head last), and 'Age' (array of int - the age of each seed point).
+
+    |
+    """
+
+    n_points=len(points['Age'])
+    lats=numpy.empty((n_points,n_steps+1))
+    lons=numpy.empty((n_points,n_steps+1))
+    lats[:,0]=points['Latitude']
+    lons[:,0]=points['Longitude']
+    for step in range(n_steps):
+        lats[:,step+1],lons[:,step+1]=_rk2_step(lats[:,step],lons[:,step],
+                                                u,v,dt)
+    return {'Latitude': lats,
+            'Longitude':lons,
+            'Age':      numpy.array(points['Age'])}
+
+# Move a set of trails on by one time step, and restore even coverage
+def advance_trails(trails,u,v,dt,
+                   lat_range=None,
+                   lon_range=None,
+                   scale=5.0,
+                   random_state=None,
+                   max_points=10000,
+                   periodic=False,
+                   metric='plot'):
+    """Move a set of trails on by one time step - for animations.
+
+    Each trail gets a new head one step further along the wind, and loses its tail. Trails whose heads have left the region, or come too close to the head of an older trail, are dropped, and new trails are started (with :func:`make_trails`) to fill any holes - so the trails from one frame are reused in the next, and only the new ones need integrating in full.
+
+    Args:
+        trails (:obj:`dict`): Trails - output from :func:`make_trails` or a previous call to this function.
+        u (:obj:`iris.cube.Cube`): Zonal wind (m/s) - must have dimensions 'latitude' and 'longitude', in the same coordinate system as the trails.
+        v (:obj:`iris.cube.Cube`): Meridional wind (m/s) - same grid as u.
+        dt (:obj:`float`): Time step (s).
+        lat_range (:obj:`list`, optional): The latitude range to cover with trails. Defaults to None - the latitude range of the wind grid.
+        lon_range (:obj:`list`, optional): The longitude range to cover with trails. Defaults to None - the longitude range of the wind grid.
+        scale (:obj:`float`): Characteristic separation between trail heads (in degrees).
+        random_state (None|:obj:`int`|:obj:`numpy.random.RandomState`): Random number generation seed, see :func:`sklearn.utils.check_random_state`.
+        max_points (:obj:`int`, optional): Maximum number of trails, defaults to 10,000.
+        periodic (:obj:`bool`, optional): Wrap trail heads around in longitude - see :func:`allocate_vector_points`. Defaults to False.
+        metric (:obj:`str`, optional): How to measure separation - see :func:`allocate_vector_points`. Defaults to 'plot'.
+
+    Returns:
+        :obj:`dict`: The new trails - same form as from :func:`make_trails`.
+
+    |
+    """
+
+    if lat_range is None:
+        lat_range=(min(u.coord('latitude').points),
+                   max(u.coord('latitude').points))
+    if lon_range is None:
+        lon_range=(min(u.coord('longitude').points),
+                   max(u.coord('longitude').points))
+
+    lats=numpy.roll(trails['Latitude'],-1,axis=1)
+    lons=numpy.roll(trails['Longitude'],-1,axis=1)
+    lats[:,-1],lons[:,-1]=_rk2_step(lats[:,-2],lons[:,-2],u,v,dt)
+
+    # Oldest first, so they win when heads crowd together
+    order=numpy.argsort(-numpy.asarray(trails['Age']),kind='stable')
+    heads={'Latitude': lats[order,-1],
+           'Longitude':lons[order,-1],
+           'Age':      numpy.asarray(trails['Age'])[order]}
+    points,kept=_allocate_vector_points(heads,lat_range,lon_range,
+                                        scale,random_state,max_points,
+                                        periodic,metric)
+    kept=order[kept]
+    # Heads may have been wrapped round in longitude - move their
+    #  trails with them
+    lons=lons[kept]
+    lons+=(points['Longitude'][:len(kept)]-lons[:,-1])[:,numpy.newaxis]
+    new={'Latitude': points['Latitude'][len(kept):],
+         'Longitude':points['Longitude'][len(kept):],
+         'Age':      points['Age'][len(kept):]}
+    new=make_trails(new,u,v,dt,n_steps=lats.shape[1]-1)
+    return {'Latitude': numpy.concatenate((lats[kept],new['Latitude'])),
+            'Longitude':numpy.concatenate((lons,new['Longitude'])),
+            'Age':      numpy.concatenate((points['Age'][:len(kept)],
+                                           new['Age']))}
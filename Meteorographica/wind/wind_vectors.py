@@ -15,8 +15,14 @@
 
 import numpy
 import math
+import concurrent.futures
 import sklearn.utils
 
+import Meteorographica.utils as utils
+
+# Metres in one degree of latitude
+metres_per_degree=6371229.0*math.pi/180
+
 # Generate a set of random points at distance between 1 and 2
 #  from (0,0) - we'll sample from these many times.
 # Uses a fixed seed, so should get same set of points every time
@@ -36,13 +42,14 @@ def allocate_vector_points(initial_points=None,
                            lon_range=(-180,180),
                            scale=5.0,
                            random_state=None,
-                           max_points=10000):
+                           max_points=10000,
+                           periodic=False,
+                           metric='plot'):
     """Allocate even coverage of points over a 2d space - for wind vectors.
 
-    *WARNING* This function is broken/unfinished - do not use.
-
     To plot wind vectors in a video, we need an even coverage that moves with the wind. So we need a function that will take a set of wind-vector locations and keep their coverage fairly even, by removing any that have got too close together, and seeding new ones to fill any holes in the coverage.
 
+    Points are tracked on an occupancy grid, and seeded from an active list: the oldest active point is tried first, and dropped from the list once 100 random candidates around it are all blocked. Each point is retired from the active list only once, so the fill is O(n) in the number of points, and the 100 candidates are all tested against the grid in one vectorised step. With the same random_state, the same points are produced.
 
     Args:
         initial points (:obj:`dict`, optional): None (default) or the output from a previous run of this function (see return value).
@@ -51,6 +58,8 @@ def allocate_vector_points(initial_points=None,
         scale (:obj:`float`): Characteristic separation between points (in degrees).
         random_state (None|:obj:`int`|:obj:`numpy.random.RandomState`): Random number generation seed, see :func:`sklearn.utils.check_random_state`.
         max_points (:obj:`int`, optional): Maximum number of points to allocate, defaults to 10,000.
+        periodic (:obj:`bool`, optional): If True, lon_range is a full circle (it must span 360 degrees): the occupancy grid wraps around in longitude, so there is no seam at the ends of the range, and points outside the range are wrapped into it. Defaults to False.
+        metric (:obj:`str`, optional): How to measure separation. 'plot' (default) - in degrees of latitude and longitude, so the points are evenly spaced on a lat:lon (or rotated-pole) plot. 'sphere' - distance on the sphere, so the longitude separation grows as 1/cos(latitude), and there are fewer points at high latitudes.
 
 
     Returns:
@@ -61,123 +70,379 @@ def allocate_vector_points(initial_points=None,
 
     |
     """
-    
 
+    return _allocate_vector_points(initial_points,lat_range,lon_range,
+                                   scale,random_state,max_points,
+                                   periodic,metric)[0]
+
+# Body of allocate_vector_points - also returns the indices of the
+#  initial points that were kept (in the order they were kept).
+#  The first n_inactive initial points are not used to seed new
+#  points, and cellsize_x overrides the longitude size of a grid cell.
+def _allocate_vector_points(initial_points,lat_range,lon_range,
+                            scale,random_state,max_points,
+                            periodic=False,metric='plot',
+                            n_inactive=0,cellsize_x=None):
+
+    if metric not in ('plot','sphere'):
+        raise Exception("Unsupported metric %s" % metric)
     random_state=sklearn.utils.check_random_state(random_state)
     cellsize=scale/math.sqrt(2)
-    x_n_cells=int(math.ceil((lon_range[1]-lon_range[0])/cellsize))
+    lon_span=lon_range[1]-lon_range[0]
+    if periodic:
+        if abs(lon_span-360)>1.0e-6:
+            raise Exception("Periodic longitude range must span 360 degrees")
+        # Cells must fit exactly into the circle
+        x_n_cells=_periodic_n_cells(scale)
+        cellsize_x=lon_span/x_n_cells
+    else:
+        if cellsize_x is None:
+            cellsize_x=cellsize
+        x_n_cells=int(math.ceil(lon_span/cellsize_x))
     y_n_cells=int(math.ceil((lat_range[1]-lat_range[0])/cellsize))
 
-    # Point lon & lat to grid indices
-    def grid_coords(x,y):
-        return (int(math.floor((x-lon_range[0])/cellsize)), 
-                int(math.floor((y-lat_range[0])/cellsize)))
-
-    # Block of cells too close to a point
-    def too_close(x,y):
-        centre_cell=grid_coords(x,y)
-        # 5x5 block around the centre cell
-        close_idx=numpy.meshgrid(numpy.arange(centre_cell[0]-2,
-                                              centre_cell[0]+3),
-                                 numpy.arange(centre_cell[1]-2,
-                                              centre_cell[1]+3))
-        # remove the corners
-        corners=numpy.array((0,4,20,24))
-        close_idx[0]=numpy.delete(close_idx[0],corners)
-        close_idx[1]=numpy.delete(close_idx[1],corners)
-        # remove any points outside the grid range
-        in_p=numpy.logical_and(close_idx[0]>=0,
-                               close_idx[0]<x_n_cells)
-        close_idx[0]=close_idx[0][in_p]
-        close_idx[1]=close_idx[1][in_p]
-        in_p=numpy.logical_and(close_idx[1]>=0,
-                               close_idx[1]<y_n_cells)
-        close_idx[0]=close_idx[0][in_p]
-        close_idx[1]=close_idx[1][in_p]
-        return(close_idx)
-
-    # Try and find a new point close to a seed point
+    # Grid marking occupied cells. Padded, so neither marking the
+    #  cells round a point nor looking up a candidate just outside the
+    #  region needs a bounds check. Flattened, so a cell is one index.
+    pad=5
+    y_stride=y_n_cells+2*pad
+    occupied=numpy.zeros((x_n_cells+2*pad)*y_stride,dtype=bool)
+
+    # Point lon & lat to grid indices - works on arrays too
+    def cell_x(x):
+        ix=numpy.floor((x-lon_range[0])/cellsize_x).astype(int)
+        if periodic:
+            ix=numpy.mod(ix,x_n_cells)
+        return ix
+    def cell_y(y):
+        return numpy.floor((y-lat_range[0])/cellsize).astype(int)
+    def grid_index(x,y):
+        return (cell_x(x)+pad)*y_stride+cell_y(y)+pad
+
+    # Block of cells too close to a point - 5x5 block around the
+    #  centre cell, without the corners
+    block=numpy.meshgrid(numpy.arange(-2,3),numpy.arange(-2,3))
+    corners=numpy.array((0,4,20,24))
+    block_x=numpy.delete(block[0],corners)
+    block_y=numpy.delete(block[1],corners)
+    block=block_x*y_stride+block_y
+
+    # Measuring distance on the sphere, the block is wider (in
+    #  longitude) at high latitudes - 1/cos(latitude) times as wide.
+    #  Blocks are made as needed and kept for re-use.
+    wide_blocks={}
+    def x_stretch(y):
+        if metric=='plot':
+            return 1.0
+        return 1.0/max(math.cos(math.radians(y)),1.0e-3)
+    def wide_block(stretch):
+        k_mid=min(int(math.ceil(2*stretch)),x_n_cells)
+        k_end=min(int(math.ceil(stretch)),x_n_cells)
+        if (k_mid,k_end) not in wide_blocks:
+            bx=[];by=[]
+            for dy,k in ((-2,k_end),(-1,k_mid),(0,k_mid),(1,k_mid),(2,k_end)):
+                bx.append(numpy.arange(-k,k+1))
+                by.append(numpy.full(2*k+1,dy))
+            wide_blocks[(k_mid,k_end)]=(numpy.concatenate(bx),
+                                        numpy.concatenate(by))
+        return wide_blocks[(k_mid,k_end)]
+
+    def mark_occupied(x,y):
+        if metric=='plot' and not periodic:
+            occupied[block+grid_index(x,y)]=True
+            return
+        bx,by=wide_block(x_stretch(y))
+        ix=bx+cell_x(x)
+        if periodic:
+            ix=numpy.mod(ix,x_n_cells)
+        else:
+            in_p=(ix>=-pad) & (ix<x_n_cells+pad)
+            ix=ix[in_p]
+            by=by[in_p]
+        occupied[(ix+pad)*y_stride+by+cell_y(y)+pad]=True
+
+    # Candidate offsets, in degrees
+    offset_x=sample_cache_x*scale
+    offset_y=sample_cache_y*scale
+
+    # Random candidate choices are drawn in batches - the sequence is
+    #  the same as drawing 100 at a time
+    batch=[numpy.zeros((0,100),dtype=int),0]
+    def next_candidates():
+        if batch[1]>=len(batch[0]):
+            batch[0]=random_state.randint(len(sample_cache_x),
+                                          size=100*256).reshape(256,100)
+            batch[1]=0
+        batch[1] +=1
+        return batch[0][batch[1]-1]
+
+    # Try and find a new point close to a seed point - the first of
+    #  100 random candidates that's in range and in a free cell.
     def find_new(x,y):
-        sub_s=random_state.randint(len(sample_cache_x),size=100)
-        for samp in sub_s:
-            if (x+sample_cache_x[samp]*scale<lon_range[0] or
-                x+sample_cache_x[samp]*scale>lon_range[1] or
-                y+sample_cache_y[samp]*scale<lat_range[0] or
-                y+sample_cache_y[samp]*scale>lat_range[1]): continue
-            gc=grid_coords(x+sample_cache_x[samp]*scale,
-                           y+sample_cache_y[samp]*scale)
-            if(occupied[gc[0],gc[1]]==0): return (x+sample_cache_x[samp]*scale,
-                                                  y+sample_cache_y[samp]*scale)
-        return None
-        
+        sub_s=next_candidates()
+        if metric=='plot':
+            cx=x+offset_x[sub_s]
+        else:
+            cx=x+offset_x[sub_s]*x_stretch(y)
+        cy=y+offset_y[sub_s]
+        if periodic:
+            cx=lon_range[0]+numpy.mod(cx-lon_range[0],lon_span)
+            ok=(cy>=lat_range[0]) & (cy<=lat_range[1])
+        else:
+            ok=((cx>=lon_range[0]) & (cx<=lon_range[1]) &
+                (cy>=lat_range[0]) & (cy<=lat_range[1]))
+            if metric=='sphere':
+                # Stretched candidates can be far outside the grid
+                cx=numpy.where(ok,cx,lon_range[0])
+        ok &= ~occupied[grid_index(cx,cy)]
+        first=ok.argmax()
+        if not ok[first]: return None
+        return (cx[first],cy[first])
+
     # Store the allocated points in a dictionary
     allocated={'Latitude': numpy.zeros([max_points],float),
                'Longitude':numpy.zeros([max_points],float),
                'Age':      numpy.zeros([max_points],int)}
     n_allocated=0 # Nothing in it yet
-    # Store the culled points similarly
-    culled={'Latitude': numpy.zeros([max_points],float),
-            'Longitude':numpy.zeros([max_points],float),
-            'Age':      numpy.zeros([max_points],int)}
-    n_culled=0 # Nothing in it yet
-    active=numpy.zeros([max_points])
+    n_seeded=0    # Points not to use as seeds
+    kept=[]
 
-    # Grid marking occupied cells
-    occupied=numpy.zeros([x_n_cells,y_n_cells]) # 0=free cell
+    # Add a point to the allocated set, and mark its neighbourhood
+    def add_point(x,y,age):
+        if n_allocated>=max_points:
+            raise Exception("Insufficient wind points")
+        allocated['Longitude'][n_allocated]=x
+        allocated['Latitude'][n_allocated]=y
+        allocated['Age'][n_allocated]=age
+        mark_occupied(x,y)
 
     # Insert the initial points, rejecting any that overlap
     if initial_points is not None:
-        for init_i in range(0,len(initial_points['Age'])):
-            if initial_points['Latitude'][init_i] < lat_range[0] or\
-               initial_points['Latitude'][init_i] > lat_range[1]: continue
-            if initial_points['Longitude'][init_i] < lon_range[0] or\
-               initial_points['Longitude'][init_i] > lon_range[1]: continue
-            cdrs=grid_coords(initial_points['Longitude'][init_i],
-                             initial_points['Latitude'][init_i])
-            if occupied[cdrs[0],cdrs[1]]!=0: continue  # reject
-            # Add it to the newly allocated list
-            allocated['Latitude'][n_allocated]=initial_points['Latitude'][init_i]
-            allocated['Longitude'][n_allocated]=initial_points['Longitude'][init_i]
-            allocated['Age'][n_allocated]=initial_points['Age'][init_i]+1
-            # Mark the region around it as occupied
-            tc=too_close(initial_points['Longitude'][init_i],
-                         initial_points['Latitude'][init_i])
-            occupied[tc[0],tc[1]]=1
-            active[n_allocated]=1 # Seed new points from this one
+        i_lat=numpy.asarray(initial_points['Latitude'])
+        i_lon=numpy.asarray(initial_points['Longitude'])
+        i_age=numpy.asarray(initial_points['Age'])
+        if periodic:
+            i_lon=lon_range[0]+numpy.mod(i_lon-lon_range[0],lon_span)
+        in_range=((i_lat>=lat_range[0]) & (i_lat<=lat_range[1]) &
+                  (i_lon>=lon_range[0]) & (i_lon<=lon_range[1]))
+        i_index=numpy.where(in_range)[0]
+        i_cells=grid_index(i_lon[in_range],i_lat[in_range])
+        for init_i,cell in zip(i_index,i_cells):
+            if occupied[cell]: continue  # reject
+            add_point(i_lon[init_i],i_lat[init_i],i_age[init_i]+1)
+            kept.append(init_i)
             n_allocated +=1
-            if n_allocated>max_points:
-                raise Exception("Insufficient wind points")
+            if init_i<n_inactive:
+                n_seeded=n_allocated
 
     # Add a seed point if there were no initial points
     if n_allocated==0:
-        seed_x=lon_range[0]*.9+lon_range[1]*.1
-        seed_y=lat_range[0]*.9+lat_range[1]*.1
-        allocated['Longitude'][n_allocated]=seed_x
-        allocated['Latitude'][n_allocated]=seed_y
-        allocated['Age'][n_allocated]=0
-        tc=too_close(seed_x,seed_y)
-        occupied[tc[0],tc[1]]=1
-        active[n_allocated]=1 # Seed new points from this one
+        add_point(lon_range[0]*.9+lon_range[1]*.1,
+                  lat_range[0]*.9+lat_range[1]*.1,0)
         n_allocated +=1
 
-    # Fill in remaining space with Bridson's method
-    while len(numpy.where(active==1)[0])>0:
-        current=min(numpy.where(active==1)[0])
+    # Fill in remaining space with Bridson's method. Points are only
+    #  ever added after the current one, and a point leaves the active
+    #  list only when it can't seed any more, so the active list is
+    #  just everything from 'current' to the end.
+    current=n_seeded
+    while current<n_allocated:
         new_point=find_new(allocated['Longitude'][current],
                            allocated['Latitude'][current])
         if new_point is None:
-            active[current]=0
+            current +=1
             continue
-        allocated['Longitude'][n_allocated]=new_point[0]
-        allocated['Latitude'][n_allocated]=new_point[1]
-        allocated['Age'][n_allocated]=0
-        tc=too_close(new_point[0],new_point[1])
-        occupied[tc[0],tc[1]]=1
-        active[n_allocated]=1
+        add_point(new_point[0],new_point[1],0)
         n_allocated +=1
-        if n_allocated>max_points:
-            raise Exception("Insufficient wind points")
 
-    return {'Longitude': allocated['Longitude'][0:n_allocated],
-            'Latitude':  allocated['Latitude'][0:n_allocated],
-            'Age':       allocated['Age'][0:n_allocated]}
+    return ({'Longitude': allocated['Longitude'][0:n_allocated],
+             'Latitude':  allocated['Latitude'][0:n_allocated],
+             'Age':       allocated['Age'][0:n_allocated]},
+            numpy.array(kept,dtype=int))
+
+# Number of longitude cells round a periodic occupancy grid
+def _periodic_n_cells(scale):
+    return max(1,int(math.floor(360/(scale/math.sqrt(2)))))
+
+# Sample one tile - in a worker process
+def _allocate_tile(args):
+    return _allocate_vector_points(*args)[0]
+
+# Allocate wind vector points over a large region, a tile at a time
+def allocate_vector_points_parallel(lat_range=(-90,90),
+                                    lon_range=(-180,180),
+                                    scale=5.0,
+                                    random_state=None,
+                                    max_points=10000,
+                                    periodic=False,
+                                    metric='plot',
+                                    tile_size=None,
+                                    workers=None):
+    """Allocate even coverage of points over a 2d space - in parallel, for very large numbers of points.
+
+    Makes the same sort of coverage as :func:`allocate_vector_points`, but splits the region into tiles, and fills each tile independently (in a pool of worker processes, if workers is set). Points from neighbouring tiles can then crowd each other along the tile borders, so a second pass goes over the whole region: points away from the borders are kept as they are, and only the points in a strip along each border are checked (the later of any two that are too close is dropped) and used to seed new points to fill any gaps.
+
+    Each tile gets its own random seed, drawn from random_state, so the result is the same for any number of workers (including none).
+
+    Args:
+        lat_range (:obj:`list`, optional): The latitude range to cover with points. Defaults to (-90,90).
+        lon_range (:obj:`list`, optional): The longitude range to cover with points. Defaults to (-180,180).
+        scale (:obj:`float`): Characteristic separation between points (in degrees).
+        random_state (None|:obj:`int`|:obj:`numpy.random.RandomState`): Random number generation seed, see :func:`sklearn.utils.check_random_state`.
+        max_points (:obj:`int`, optional): Maximum number of points to allocate, defaults to 10,000.
+        periodic (:obj:`bool`, optional): Wrap around in longitude - see :func:`allocate_vector_points`. Defaults to False.
+        metric (:obj:`str`, optional): How to measure separation - see :func:`allocate_vector_points`. Defaults to 'plot'.
+        tile_size (:obj:`float`, optional): Approximate size of a tile (in degrees). Defaults to None - 50 times scale.
+        workers (:obj:`int`, optional): Number of processes to use. Defaults to None - do everything in this process.
+
+    Returns:
+        :obj:`dict`: Same as :func:`allocate_vector_points`.
+
+    Raises:
+        StandardError: if max_points is too small - more points than this are needed to cover the region.
+
+    |
+    """
+
+    random_state=sklearn.utils.check_random_state(random_state)
+    if tile_size is None:
+        tile_size=50*scale
+    # Tile edges fall on occupancy grid cell edges, so a point
+    #  accepted in a tile is accepted in the same grid cells by
+    #  the second pass.
+    cellsize=scale/math.sqrt(2)
+    cellsize_x=cellsize
+    if periodic:
+        cellsize_x=(lon_range[1]-lon_range[0])/_periodic_n_cells(scale)
+    def tile_edges(start,end,size):
+        n_cells=int(math.ceil((end-start)/size))
+        n_per_tile=max(1,int(round(tile_size/size)))
+        edges=[start+i*size for i in range(0,n_cells,n_per_tile)]
+        return numpy.array(edges[:1]+[e for e in edges[1:] if e<end]+[end])
+    lon_edges=tile_edges(lon_range[0],lon_range[1],cellsize_x)
+    lat_edges=tile_edges(lat_range[0],lat_range[1],cellsize)
+
+    tiles=[]
+    for i_lat in range(len(lat_edges)-1):
+        for i_lon in range(len(lon_edges)-1):
+            tiles.append((None,
+                          (lat_edges[i_lat],lat_edges[i_lat+1]),
+                          (lon_edges[i_lon],lon_edges[i_lon+1]),
+                          scale,None,max_points,False,metric,0,cellsize_x))
+    seeds=random_state.randint(2**31-1,size=len(tiles)+1)
+    tiles=[t[:4]+(seed,)+t[5:] for t,seed in zip(tiles,seeds)]
+    if workers is None or workers<2 or len(tiles)<2:
+        filled=[_allocate_tile(tile) for tile in tiles]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(
+                           max_workers=min(workers,len(tiles))) as pool:
+            filled=list(pool.map(_allocate_tile,tiles))
+
+    lats=numpy.concatenate([f['Latitude'] for f in filled])
+    lons=numpy.concatenate([f['Longitude'] for f in filled])
+
+    # Points near a border between tiles (or round the periodic seam)
+    #  go after all the others, and are the only seeds in the second pass
+    border_width=3*scale
+    internal_lon=lon_edges[1:-1]
+    if periodic:
+        internal_lon=numpy.append(internal_lon,lon_edges[[0,-1]])
+    def near(values,edges,width):
+        if len(edges)==0:
+            return numpy.zeros(values.shape,dtype=bool)
+        return (numpy.absolute(values[:,numpy.newaxis]-
+                               edges[numpy.newaxis,:]).min(axis=1)<width)
+    lon_width=border_width
+    if metric=='sphere':
+        lon_width=border_width/numpy.maximum(numpy.cos(numpy.radians(lats)),
+                                             1.0e-3)
+    border=(near(lons,internal_lon,lon_width) |
+            near(lats,lat_edges[1:-1],border_width))
+    n_inactive=len(border)-numpy.count_nonzero(border)
+    order=numpy.argsort(border,kind='stable')
+    points=_allocate_vector_points({'Latitude': lats[order],
+                                    'Longitude':lons[order],
+                                    'Age':      numpy.zeros(len(order),int)},
+                                   lat_range,lon_range,
+                                   scale,seeds[-1],max_points,
+                                   periodic,metric,n_inactive,
+                                   None if periodic else cellsize_x)[0]
+    points['Age'][:]=0
+    return points
+
+# Move points along the wind for one time step, with a vectorised
+#  midpoint (2nd order Runge-Kutta) integrator. Winds in m/s, positions
+#  in degrees, dt in seconds.
+def _rk2_step(lats,lons,u,v,dt):
+
+    # Rate of change of position (degrees/s) at a set of points
+    def velocity(lats,lons):
+        u_i=numpy.ma.filled(utils.sample_points(u,lats,lons,
+                                           dtype=numpy.float64),0)
+        v_i=numpy.ma.filled(utils.sample_points(v,lats,lons,
+                                           dtype=numpy.float64),0)
+        coslat=numpy.maximum(numpy.cos(numpy.radians(lats)),0.01)
+        return (v_i/metres_per_degree,
+                u_i/(metres_per_degree*coslat))
+
+    dlat,dlon=velocity(lats,lons)
+    dlat,dlon=velocity(lats+dlat*dt/2,lons+dlon*dt/2)
+    return (lats+dlat*dt,lons+dlon*dt)
+
+# Move a set of wind vector points along the wind, then even out
+#  their coverage for the next frame of an animation.
+def advect_vector_points(points,u,v,dt,
+                         lat_range=None,
+                         lon_range=None,
+                         scale=5.0,
+                         random_state=None,
+                         max_points=10000,
+                         periodic=False,
+                         metric='plot'):
+    """Move a set of points along the wind, and restore even coverage - for wind vector animations.
+
+    Each point is moved for time dt with a midpoint (2nd order Runge-Kutta) step, all points at once, with the winds at the points found by :func:`Meteorographica.utils.sample_points`. Then the points are passed back through :func:`allocate_vector_points` as initial points: any that have left the region, or come too close to an older point, are dropped, and new points are seeded to fill any holes. Older points are kept in preference to younger ones, so long-lived vectors persist from frame to frame.
+
+    Args:
+        points (:obj:`dict`): Point set - output from :func:`allocate_vector_points` or a previous call to this function.
+        u (:obj:`iris.cube.Cube`): Zonal wind (m/s) - must have dimensions 'latitude' and 'longitude', in the same coordinate system as the points (the plot coordinates, for points from :func:`Meteorographica.wind.plot_quiver`).
+        v (:obj:`iris.cube.Cube`): Meridional wind (m/s) - same grid as u.
+        dt (:obj:`float`): Time step (s).
+        lat_range (:obj:`list`, optional): The latitude range to cover with points. Defaults to None - the latitude range of the wind grid.
+        lon_range (:obj:`list`, optional): The longitude range to cover with points. Defaults to None - the longitude range of the wind grid.
+        scale (:obj:`float`): Characteristic separation between points (in degrees).
+        random_state (None|:obj:`int`|:obj:`numpy.random.RandomState`): Random number generation seed, see :func:`sklearn.utils.check_random_state`.
+        max_points (:obj:`int`, optional): Maximum number of points to allocate, defaults to 10,000.
+        periodic (:obj:`bool`, optional): Wrap points around in longitude - see :func:`allocate_vector_points`. Defaults to False.
+        metric (:obj:`str`, optional): How to measure separation - see :func:`allocate_vector_points`. Defaults to 'plot'.
+
+    Returns:
+        :obj:`dict`: The new point set - same form as from :func:`allocate_vector_points`.
+
+    |
+    """
+
+    if lat_range is None:
+        lat_range=(min(u.coord('latitude').points),
+                   max(u.coord('latitude').points))
+    if lon_range is None:
+        lon_range=(min(u.coord('longitude').points),
+                   max(u.coord('longitude').points))
+
+    lats,lons=_rk2_step(numpy.asarray(points['Latitude'],dtype=float),
+                        numpy.asarray(points['Longitude'],dtype=float),
+                        u,v,dt)
+
+    # Oldest first, so they win when points crowd together
+    order=numpy.argsort(-numpy.asarray(points['Age']),kind='stable')
+    moved={'Latitude': lats[order],
+           'Longitude':lons[order],
+           'Age':      numpy.asarray(points['Age'])[order]}
+    return allocate_vector_points(initial_points=moved,
+                                  lat_range=lat_range,
+                                  lon_range=lon_range,
+                                  scale=scale,
+                                  random_state=random_state,
+                                  max_points=max_points,
+                                  periodic=periodic,
+                                  metric=metric)
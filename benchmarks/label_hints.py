@@ -0,0 +1,145 @@
+# Meteorographica benchmark script
+
+# Compare the speed of pressure.make_label_hints with the
+#  vertex-by-vertex implementation it replaced, and check that the
+#  two give the same label positions.
+
+import time
+import numpy
+
+import matplotlib
+matplotlib.use('agg')
+import matplotlib.pyplot
+
+import Meteorographica as mg
+
+# The label hints only need the axes extent, so a plain
+#  matplotlib axes with a get_extent method will do.
+class ExtentAxes(object):
+    def __init__(self,extent):
+        self.extent=extent
+    def get_extent(self):
+        return self.extent
+
+# Original implementation - kept here for comparison
+def make_label_hints_loop(ax,allsegs):
+    label_locations=[]
+    buffer=(ax.get_extent()[1]-ax.get_extent()[0])/20.0
+    for segments in allsegs:
+        for segment in segments:
+            left_edge=None
+            right_edge=None
+            bottom_edge=None
+            top_edge=None
+            bottom_point=None
+          # Find a suitable spot to label the segment
+            for si in range(len(segment)):
+                if (left_edge is None) and (si>0):
+                    if ((segment[si][0]>=(ax.get_extent()[0]+buffer)) and
+                        (segment[si-1][0]<(ax.get_extent()[0]+buffer))):
+                        weight=((segment[si][0]-(ax.get_extent()[0]+buffer))/
+                                            (segment[si][0]-segment[si-1][0]))
+                        left_edge=(ax.get_extent()[0]+buffer,
+                                   segment[si][1]+
+                                  (segment[si][1]-segment[si-1][1])*weight)
+                if (left_edge is None) and (si<(len(segment)-1)):
+                    if ((segment[si][0]>=(ax.get_extent()[0]+buffer)) and
+                        (segment[si+1][0]<(ax.get_extent()[0]+buffer))):
+                        weight=((segment[si][0]-(ax.get_extent()[0]+buffer))/
+                                            (segment[si][0]-segment[si+1][0]))
+                        left_edge=(ax.get_extent()[0]+buffer,
+                                   segment[si][1]+
+                                  (segment[si][1]-segment[si+1][1])*weight)
+                if (right_edge is None) and (si>0):
+                    if ((segment[si][0]>=(ax.get_extent()[1]-buffer)) and
+                        (segment[si-1][0]<(ax.get_extent()[1]-buffer))):
+                        weight=((segment[si][0]-(ax.get_extent()[1]-buffer))/
+                                            (segment[si][0]-segment[si-1][0]))
+                        right_edge=(ax.get_extent()[1]-buffer,
+                                   segment[si][1]+
+                                  (segment[si][1]-segment[si-1][1])*weight)
+                if (right_edge is None) and (si<(len(segment)-1)):
+                    if ((segment[si][0]>=(ax.get_extent()[1]-buffer)) and
+                        (segment[si+1][0]<(ax.get_extent()[1]-buffer))):
+                        weight=((segment[si][0]-(ax.get_extent()[1]-buffer))/
+                                            (segment[si][0]-segment[si+1][0]))
+                        right_edge=(ax.get_extent()[1]-buffer,
+                                   segment[si][1]+
+                                  (segment[si][1]-segment[si+1][1])*weight)
+                if (bottom_edge is None) and (si>0):
+                    if ((segment[si][1]>=(ax.get_extent()[2]+buffer)) and
+                        (segment[si-1][1]<(ax.get_extent()[2]+buffer))):
+                        weight=((segment[si][1]-(ax.get_extent()[2]+buffer))/
+                                            (segment[si][1]-segment[si-1][1]))
+                        bottom_edge=(segment[si][0]+
+                                     (segment[si][0]-segment[si-1][0])*weight,
+                                     ax.get_extent()[2]+buffer)
+                if (bottom_edge is None) and (si<(len(segment)-1)):
+                    if ((segment[si][1]>=(ax.get_extent()[2]+buffer)) and
+                        (segment[si+1][1]<(ax.get_extent()[2]+buffer))):
+                        weight=((segment[si][1]-(ax.get_extent()[2]+buffer))/
+                                            (segment[si][1]-segment[si+1][1]))
+                        bottom_edge=(segment[si][0]+
+                                     (segment[si][0]-segment[si+1][0])*weight,
+                                     ax.get_extent()[2]+buffer)
+                if (top_edge is None) and (si>0):
+                    if ((segment[si][1]>=(ax.get_extent()[3]-buffer)) and
+                        (segment[si-1][1]<(ax.get_extent()[3]-buffer))):
+                        weight=((segment[si][1]-(ax.get_extent()[3]-buffer))/
+                                            (segment[si][1]-segment[si-1][1]))
+                        top_edge=(segment[si][0]+
+                                     (segment[si][0]-segment[si-1][0])*weight,
+                                     ax.get_extent()[3]-buffer)
+                if (top_edge is None) and (si<(len(segment)-1)):
+                    if ((segment[si][1]>=(ax.get_extent()[3]-buffer)) and
+                        (segment[si+1][1]<(ax.get_extent()[3]-buffer))):
+                        weight=((segment[si][1]-(ax.get_extent()[3]-buffer))/
+                                            (segment[si][1]-segment[si+1][1]))
+                        top_edge=(segment[si][0]+
+                                     (segment[si][0]-segment[si+1][0])*weight,
+                                     ax.get_extent()[3]-buffer)
+                if bottom_point is None or segment[si][1]<bottom_point[1]:
+                        bottom_point=(segment[si][0],segment[si][1])
+            if left_edge is not None:
+                label_locations.append(left_edge)
+            if right_edge is not None:
+                label_locations.append(right_edge)
+            if left_edge is None and right_edge is None:
+                if bottom_edge is not None:
+                    label_locations.append(bottom_edge)
+                if top_edge is not None:
+                    label_locations.append(top_edge)
+                if bottom_edge is None and top_edge is None:
+                    label_locations.append(bottom_point)
+
+    return label_locations
+
+
+# A synthetic mslp-like field on a 0.25 degree global grid
+lons=numpy.arange(-180,180,0.25)
+lats=numpy.arange(-90,90.01,0.25)
+lons,lats=numpy.meshgrid(lons,lats)
+field=(1010+
+       20*numpy.sin(numpy.radians(lons)*3)*numpy.cos(numpy.radians(lats)*2)+
+       15*numpy.cos(numpy.radians(lons)*7+1)*numpy.sin(numpy.radians(lats)*5))
+
+fig=matplotlib.pyplot.figure()
+CS=fig.gca().contour(lons,lats,field,levels=numpy.arange(870,1050,10))
+ax=ExtentAxes((-180.0,180.0,-90.0,90.0))
+allsegs=mg.pressure.lines._contour_segments(CS)
+
+start=time.time()
+hints_loop=make_label_hints_loop(ax,allsegs)
+time_loop=time.time()-start
+
+start=time.time()
+hints=mg.pressure.make_label_hints(ax,CS)
+time_vector=time.time()-start
+
+n_vertices=sum(len(s) for segments in allsegs for s in segments)
+print("%d contour vertices, %d label hints" % (n_vertices,len(hints)))
+print("Vertex loop: %8.4f s" % time_loop)
+print("Vectorised:  %8.4f s" % time_vector)
+if (len(hints)!=len(hints_loop) or
+    not numpy.allclose(numpy.array(hints),numpy.array(hints_loop))):
+    raise Exception("Label hints differ between implementations")
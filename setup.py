@@ -50,6 +50,7 @@ setup(
     # Other packages that your project depends on.
     install_requires=[
         'scitools-iris>=2.2',
+        'dask',
         'cartopy>=0.16',
         'numpy>=1.15.2',
         'scipy>=1.1.0',